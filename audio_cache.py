@@ -0,0 +1,103 @@
+import os, tempfile, threading
+from collections import OrderedDict
+from typing import Optional
+
+# Two-tier audio cache: encoded WAV bytes for the hottest keys in memory
+# (LRU under a byte budget), everything on disk in OUT_DIR. Disk hits are
+# promoted to memory, so the hot set is served without touching disk.
+
+class MemoryTier:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._items.get(key)
+        if data is not None:
+            self._items.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._items[key] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+class AudioCache:
+    def __init__(self, out_dir: str, mem_bytes: int = 64 * 1024 * 1024, ext: str = "wav"):
+        self.out_dir = out_dir
+        self.ext = ext
+        self.mem = MemoryTier(mem_bytes)
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0, "miss": 0}
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.out_dir, f"{key}.{self.ext}")
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            if key in self.mem:
+                return True
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self.mem.get(key)
+            if data is not None:
+                self.hits["memory"] += 1
+                return data
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.hits["miss"] += 1
+            return None
+        with self._lock:
+            self.hits["disk"] += 1
+            self.mem.put(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        # write a private temp file, then rename: concurrent writers of one
+        # key (a hot greeting missed by two requests) each rename a whole
+        # file, and readers only ever see a complete one
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{key}.", suffix=".part", dir=self.out_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            # on Windows the rename fails while a reader has the target open;
+            # another request has already stored this key's audio then
+            if not (isinstance(e, PermissionError) and os.path.exists(path)):
+                raise
+        with self._lock:
+            self.mem.put(key, data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.hits.values())
+            rate = lambda n: round(n / total, 3) if total else 0.0
+            return {"memory_entries": len(self.mem), "memory_bytes": self.mem.bytes,
+                    "memory_budget": self.mem.max_bytes, **self.hits,
+                    "memory_hit_rate": rate(self.hits["memory"]),
+                    "disk_hit_rate": rate(self.hits["disk"])}
@@ -0,0 +1,208 @@
+import os, sys, csv, json, time, socket, argparse, platform, subprocess, threading
+
+# Real-time-factor benchmark over the training corpus.
+#
+#   python bench_rtf.py run --engines xtts,vits --modes cuda,cpu,int8 --threads 4,8 --limit 30
+#   python bench_rtf.py compare bench_results.json --baseline bench_baseline.json
+#
+# Every engine x mode x thread-count config runs in its own subprocess, so
+# peak memory and torch thread settings don't leak between configs. RTF is
+# synthesis time / audio duration (lower is better). Sentences longer than
+# the engine's max_chars are chunked and stitched exactly as /speak does
+# (one worker, so chunks run in order); time-to-first-chunk is when the
+# first chunk's audio is ready in that same run.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = r"C:\Users\OD~IA\ODIA-VOICE"
+DEFAULT_METADATA = os.path.join(ROOT, "metadata.csv")
+DEFAULT_VITS_DIR = os.getenv("ODIA_VITS_DIR", r"C:\ODIA-VOICE\VOICEPACK_pidgin")
+DEFAULT_REF = os.path.join(APP_DIR, "ref", "lexi_ref.wav")
+
+def load_sentences(path: str, limit: int = 0):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = [r[1].strip() for r in csv.reader(f, delimiter="|", quoting=csv.QUOTE_NONE) if len(r) > 1]
+    rows = [r for r in rows if r]
+    return rows[:limit] if limit else rows
+
+class PeakMemory:
+    """Peak RSS of this process, sampled with psutil (None if psutil is missing)."""
+
+    def __init__(self, interval_s: float = 0.05):
+        self.peak = None
+        self._stop = threading.Event()
+        try:
+            import psutil
+            self._proc = psutil.Process()
+        except ImportError:
+            self._proc = None
+        self.interval_s = interval_s
+
+    def __enter__(self):
+        if self._proc is not None:
+            self.peak = self._proc.memory_info().rss
+            threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._proc.memory_info().rss)
+            time.sleep(self.interval_s)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._proc is not None:
+            self.peak = max(self.peak, self._proc.memory_info().rss)
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+def run_one(cfg: dict) -> dict:
+    """Benchmark a single config in this process."""
+    import numpy as np
+    import torch
+    import cpu_infer
+    from engines import XTTSEngine, VITSEngine
+    from longform import split_text, stitch
+
+    device = "cuda" if cfg["mode"] == "cuda" else "cpu"
+    threads = cpu_infer.configure_threads(intra=cfg["threads"]) if device == "cpu" else None
+    sentences = load_sentences(cfg["metadata"], cfg["limit"])
+
+    with PeakMemory() as mem:
+        t0 = time.perf_counter()
+        if cfg["engine"] == "xtts":
+            engine = XTTSEngine(device=device)
+            ref = cfg["speaker_wav"]
+        else:
+            engine = VITSEngine(config=os.path.join(cfg["vits_dir"], "config.json"),
+                                checkpoint=os.path.join(cfg["vits_dir"], "best_model.pth"), device=device)
+            ref = None
+        engine.load()
+        if device == "cpu":
+            cpu_infer.optimize_synthesizer(engine.synth, quantize=cfg["mode"] == "int8", compile=False)
+        load_s = time.perf_counter() - t0
+        if device == "cuda":
+            torch.cuda.reset_peak_memory_stats()
+
+        engine.tts("Warm up.", ref)
+        rows, ttfc = [], []
+        for text in sentences:
+            # same chunking as /speak
+            chunks = split_text(text, engine.max_chars) if len(text) > engine.max_chars else [text]
+            parts, first_s = [], None
+            t = time.perf_counter()
+            for chunk in chunks:
+                parts.append(np.asarray(engine.tts(chunk, ref), dtype=np.float32))
+                if first_s is None:
+                    first_s = time.perf_counter() - t
+            wav = stitch(parts, engine.sample_rate) if len(parts) > 1 else parts[0]
+            synth_s = time.perf_counter() - t
+            audio_s = len(wav) / engine.sample_rate
+            ttfc.append(first_s * 1000)
+            rows.append({"chars": len(text), "chunks": len(chunks), "audio_s": round(audio_s, 3),
+                         "synth_s": round(synth_s, 4), "ttfc_ms": round(first_s * 1000, 1),
+                         "rtf": round(synth_s / audio_s, 4) if audio_s else None})
+
+    rtfs = [r["rtf"] for r in rows if r["rtf"] is not None]
+    total_audio = sum(r["audio_s"] for r in rows)
+    total_synth = sum(r["synth_s"] for r in rows)
+    return {"label": cfg["label"], "config": cfg, "threads": threads,
+            "sentences": rows,
+            "aggregate": {"n": len(rows), "load_s": round(load_s, 2),
+                          "rtf_total": round(total_synth / total_audio, 4) if total_audio else None,
+                          "rtf_p50": _pct(rtfs, .5), "rtf_p95": _pct(rtfs, .95),
+                          "ttfc_ms_p50": round(_pct(ttfc, .5), 1) if ttfc else None,
+                          "ttfc_ms_p95": round(_pct(ttfc, .95), 1) if ttfc else None,
+                          "peak_rss_mb": round(mem.peak / 2**20, 1) if mem.peak else None,
+                          "peak_cuda_mb": round(torch.cuda.max_memory_allocated() / 2**20, 1)
+                                          if device == "cuda" else None}}
+
+def configs(a) -> list:
+    out = []
+    for engine in a.engines.split(","):
+        for mode in a.modes.split(","):
+            for threads in ([0] if mode == "cuda" else [int(t) for t in a.threads.split(",")]):
+                label = f"{engine}-{mode}" + (f"-t{threads}" if threads else "")
+                out.append({"label": label, "engine": engine, "mode": mode, "threads": threads,
+                            "metadata": a.metadata, "limit": a.limit,
+                            "vits_dir": a.vits_dir, "speaker_wav": a.speaker_wav})
+    return out
+
+def cmd_run(a):
+    results = []
+    for cfg in configs(a):
+        print(f"== {cfg['label']}", file=sys.stderr)
+        p = subprocess.run([sys.executable, os.path.abspath(__file__), "_one", json.dumps(cfg)],
+                           capture_output=True, text=True, cwd=ROOT)
+        lines = p.stdout.strip().splitlines()
+        if p.returncode != 0 or not lines:
+            print(p.stderr[-2000:], file=sys.stderr)
+            error = p.stderr.strip().splitlines()[-1:] or [f"exit {p.returncode} with no result"]
+            results.append({"label": cfg["label"], "config": cfg, "error": error})
+            continue
+        res = json.loads(lines[-1])
+        print(f"   rtf={res['aggregate']['rtf_total']} ttfc_p50={res['aggregate']['ttfc_ms_p50']}ms "
+              f"rss={res['aggregate']['peak_rss_mb']}MB", file=sys.stderr)
+        results.append(res)
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "host": socket.gethostname(),
+              "platform": platform.platform(), "results": results}
+    for path in [a.out] + ([a.baseline] if a.save_baseline else []):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"wrote {a.out}" + (f" and baseline {a.baseline}" if a.save_baseline else ""), file=sys.stderr)
+
+# all lower-is-better; a rise beyond the tolerance is a regression
+METRICS = ("rtf_total", "rtf_p95", "ttfc_ms_p50", "peak_rss_mb", "peak_cuda_mb")
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    base = {r["label"]: r for r in baseline["results"] if "aggregate" in r}
+    regressions = []
+    print(f"{'config':24} {'metric':14} {'baseline':>10} {'current':>10} {'change':>8}")
+    for r in current["results"]:
+        if "aggregate" not in r or r["label"] not in base:
+            continue
+        for m in METRICS:
+            old, new = base[r["label"]]["aggregate"].get(m), r["aggregate"].get(m)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            flag = change > tolerance
+            if flag:
+                regressions.append((r["label"], m, old, new))
+            print(f"{r['label']:24} {m:14} {old:10.3f} {new:10.3f} {change:+7.1%}{'  REGRESSION' if flag else ''}")
+    return regressions
+
+def cmd_compare(a):
+    with open(a.results, encoding="utf-8") as f:
+        current = json.load(f)
+    with open(a.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, a.tolerance)
+    print(f"\n{len(regressions)} regression(s) over {a.tolerance:.0%}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "_one":
+        sys.path.insert(0, ROOT)
+        print(json.dumps(run_one(json.loads(sys.argv[2]))))
+        sys.exit(0)
+    ap = argparse.ArgumentParser(description="RTF benchmark for ODIA TTS engines")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run")
+    r.add_argument("--engines", default="vits,xtts")
+    r.add_argument("--modes", default="cpu,int8", help="any of cuda, cpu, int8")
+    r.add_argument("--threads", default=str(os.cpu_count() or 1), help="CPU thread counts, e.g. 2,4,8")
+    r.add_argument("--metadata", default=DEFAULT_METADATA)
+    r.add_argument("--limit", type=int, default=0, help="first N sentences (0 = all)")
+    r.add_argument("--vits-dir", default=DEFAULT_VITS_DIR)
+    r.add_argument("--speaker-wav", default=DEFAULT_REF)
+    r.add_argument("--out", default="bench_results.json")
+    r.add_argument("--baseline", default="bench_baseline.json")
+    r.add_argument("--save-baseline", action="store_true")
+    c = sub.add_parser("compare")
+    c.add_argument("results")
+    c.add_argument("--baseline", default="bench_baseline.json")
+    c.add_argument("--tolerance", type=float, default=0.10)
+    a = ap.parse_args()
+    cmd_run(a) if a.cmd == "run" else cmd_compare(a)
@@ -1,13 +1,25 @@
-﻿import os, asyncio, json
-from typing import Optional
+﻿import os, asyncio, json, uuid
+from typing import Optional, Tuple
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import httpx
 
+from history_store import HistoryStore
+from turn_cache import TurnCache
+import tracing
+
 ODIA_TTS_URL = os.getenv("ODIA_TTS_URL", "http://localhost:8002")
 CLAUDE_API_KEY = os.getenv("ANTHROPIC_API_KEY", "").strip()
 PORT = int(os.getenv("CHAT_SHIM_PORT", "8003"))
+HISTORY_DB = os.getenv("ODIA_HISTORY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_history.sqlite3"))
+HISTORY_TURNS = int(os.getenv("ODIA_HISTORY_TURNS", "20"))
+HISTORY_TOKENS = int(os.getenv("ODIA_HISTORY_TOKENS", "1500"))
+TURN_CACHE_TTL = float(os.getenv("ODIA_TURN_CACHE_TTL", "3600"))   # 0 disables
+TURN_CACHE_SIZE = int(os.getenv("ODIA_TURN_CACHE_SIZE", "512"))
+
+history = HistoryStore(HISTORY_DB, ring=HISTORY_TURNS)
+turn_cache = TurnCache(ttl_s=TURN_CACHE_TTL, max_entries=TURN_CACHE_SIZE)
 
 app = FastAPI(title="ODIA Chat Shim", version="1.0.0")
 
@@ -17,23 +29,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", tracing.TRACE_HEADER],
 )
+tracing.install(app, "chat_shim")
 
 class ChatIn(BaseModel):
     text: str
+    session_id: Optional[str] = None
 
 class ChatOut(BaseModel):
     reply_text: str
     audio_url: str
+    session_id: str
 
 @app.get("/health")
 async def health():
-    return {"status":"ok","tts":ODIA_TTS_URL}
+    return {"status":"ok","tts":ODIA_TTS_URL,"turn_cache":turn_cache.snapshot()}
 
-async def think(text: str) -> str:
+async def think(text: str, session_id: Optional[str] = None) -> Tuple[str, bool]:
+    """(reply, ok); ok is False when the LLM failed and the reply is a stand-in."""
     # If no Claude key, fallback reply
     if not CLAUDE_API_KEY:
-        return f"Thanks. I understand: {text}"
+        return f"Thanks. I understand: {text}", True
 
     # Claude API call (Messages)
     url = "https://api.anthropic.com/v1/messages"
@@ -42,12 +59,14 @@ async def think(text: str) -> str:
         "anthropic-version": "2023-06-01",
         "content-type": "application/json",
     }
+    # sqlite may wait on another writer's lock; keep that off the event loop
+    messages = (await asyncio.to_thread(history.build_messages, session_id, text, HISTORY_TOKENS)
+                if session_id else [{"role":"user","content": text}])
     body = {
         "model": "claude-3-5-sonnet-latest",
         "max_tokens": 256,
-        "messages": [
-            {"role":"user","content": text}
-        ],
+        # prior turns of this session, trimmed to the token budget
+        "messages": messages,
         "system": "You are Lexi, a friendly Nigerian voice agent. Be concise and warm."
     }
     try:
@@ -59,11 +78,11 @@ async def think(text: str) -> str:
             blocks = data.get("content", [])
             for b in blocks:
                 if isinstance(b, dict) and b.get("type") == "text" and b.get("text"):
-                    return b["text"]
-            return "Alright. How can I help you?"
+                    return b["text"], True
+            return "Alright. How can I help you?", False
     except Exception:
         # silent fallback
-        return f"Okay. I got: {text}"
+        return f"Okay. I got: {text}", False
 
 @app.post("/chat/lexi", response_model=ChatOut)
 async def chat_lexi(payload: ChatIn):
@@ -71,7 +90,18 @@ async def chat_lexi(payload: ChatIn):
     if not user_text:
         raise HTTPException(400, "Empty text")
 
-    reply_text = await think(user_text)
+    session_id = payload.session_id or uuid.uuid4().hex
+    # Only context-free turns (first of a session) share cached replies;
+    # a follow-up like "tell me more" depends on what came before.
+    first_turn = not await asyncio.to_thread(history.turns, session_id)
+    cached = turn_cache.get("lexi", user_text) if first_turn else None
+    if cached:
+        reply_text, audio_url = cached
+        await asyncio.to_thread(history.append, session_id, user_text, reply_text, "lexi")
+        return ChatOut(reply_text=reply_text, audio_url=audio_url, session_id=session_id)
+
+    with tracing.span("llm"):
+        reply_text, llm_ok = await think(user_text, session_id)
 
     # Ask ODIA TTS to speak the reply
     tts_body = {
@@ -81,14 +111,28 @@ async def chat_lexi(payload: ChatIn):
         "speed": 1.0
     }
     async with httpx.AsyncClient(timeout=60.0) as client:
-        r = await client.post(f"{ODIA_TTS_URL}/speak", json=tts_body)
+        # same trace id downstream so the TTS spans join this turn
+        with tracing.span("tts"):
+            r = await client.post(f"{ODIA_TTS_URL}/speak", json=tts_body,
+                                  headers={tracing.TRACE_HEADER: tracing.current().trace_id})
+        if r.status_code == 429:
+            # TTS is saturated; pass the backoff hint on to the caller
+            raise HTTPException(503, "TTS busy, try again later",
+                                headers={"Retry-After": r.headers.get("Retry-After", "1")})
         if r.status_code != 200:
             raise HTTPException(500, f"TTS failed: {r.text}")
         data = r.json()
         audio_url = data.get("audio_url","")
         if audio_url and not audio_url.startswith("http"):
             audio_url = f"{ODIA_TTS_URL}{audio_url}"
-        return ChatOut(reply_text=reply_text, audio_url=audio_url)
+    # only a turn the caller actually got is history; a failed one is
+    # retried by the client and must still count as a first turn
+    with tracing.span("history"):
+        await asyncio.to_thread(history.append, session_id, user_text, reply_text, "lexi")
+    # a stand-in reply from a failed LLM call must not be served for the whole TTL
+    if first_turn and llm_ok:
+        turn_cache.put("lexi", user_text, reply_text, audio_url)
+    return ChatOut(reply_text=reply_text, audio_url=audio_url, session_id=session_id)
 
 if __name__ == "__main__":
     import uvicorn
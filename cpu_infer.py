@@ -0,0 +1,148 @@
+import os, json, time, argparse
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+
+# CPU serving helpers for the Coqui models: thread sizing, dynamic int8
+# quantization of Linear layers (including XTTS's GPT-2 Conv1D layers,
+# converted to Linear first), optional torch.compile of the decoder,
+# and a small CLI that reports real-time factor and output drift of the
+# quantized model against the fp32 one.
+
+DEVICE   = os.getenv("ODIA_DEVICE", "auto")           # auto | cpu | cuda
+QUANTIZE = os.getenv("ODIA_QUANTIZE", "0") == "1"     # int8 Linear/Conv1D layers (CPU only)
+COMPILE  = os.getenv("ODIA_COMPILE", "0") == "1"      # torch.compile the waveform decoder
+THREADS  = int(os.getenv("ODIA_CPU_THREADS", "0"))    # 0 = size to the machine
+
+def pick_device() -> str:
+    if DEVICE != "auto":
+        return DEVICE
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def configure_threads(workers: int = 1, intra: int = 0, inter: int = 0) -> dict:
+    """Split the cores between model workers so they don't oversubscribe."""
+    cores = os.cpu_count() or 1
+    intra = intra or THREADS or max(1, cores // max(1, workers))
+    inter = inter or max(1, min(2, cores // intra))
+    torch.set_num_threads(intra)
+    try:
+        torch.set_num_interop_threads(inter)
+    except RuntimeError:
+        # can only be set once, before any inter-op work has started
+        inter = torch.get_num_interop_threads()
+    return {"intra_op": intra, "inter_op": inter}
+
+def _is_conv1d(m: torch.nn.Module) -> bool:
+    # transformers.pytorch_utils.Conv1D: a Linear with a transposed (in, out)
+    # weight, used by the GPT-2 decoder inside XTTS; matched by shape so
+    # transformers need not be importable here
+    return type(m).__name__ == "Conv1D" and hasattr(m, "nf") and getattr(m, "weight", None) is not None
+
+def conv1d_to_linear(module: torch.nn.Module, _done=None) -> torch.nn.Module:
+    """Replace GPT-2 Conv1D layers with equivalent nn.Linear ones, in place."""
+    done = {} if _done is None else _done   # id(Conv1D) -> Linear, for shared layers
+    for name, child in module.named_children():
+        if _is_conv1d(child):
+            linear = done.get(id(child))
+            if linear is None:
+                linear = torch.nn.Linear(child.weight.shape[0], child.nf, bias=child.bias is not None)
+                with torch.no_grad():
+                    linear.weight.copy_(child.weight.t())
+                    if child.bias is not None:
+                        linear.bias.copy_(child.bias)
+                done[id(child)] = linear
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child, done)
+    return module
+
+def quantize_linear(module: torch.nn.Module) -> torch.nn.Module:
+    # without the Conv1D conversion XTTS's autoregressive GPT, its hot path, stays fp32
+    return torch.ao.quantization.quantize_dynamic(conv1d_to_linear(module), {torch.nn.Linear}, dtype=torch.qint8)
+
+# waveform decoders of the models we serve (VITS, XTTS)
+_DECODERS = ("waveform_decoder", "hifigan_decoder")
+
+def optimize_synthesizer(synth, quantize: bool = QUANTIZE, compile: bool = COMPILE):
+    """Apply CPU optimizations in place to a TTS.utils.synthesizer.Synthesizer."""
+    model = synth.tts_model.eval()
+    if quantize:
+        model = synth.tts_model = quantize_linear(model)
+        if getattr(synth, "vocoder_model", None) is not None:
+            synth.vocoder_model = quantize_linear(synth.vocoder_model.eval())
+    if compile and hasattr(torch, "compile"):
+        for name in _DECODERS:
+            if hasattr(model, name):
+                setattr(model, name, torch.compile(getattr(model, name)))
+    return synth
+
+@contextmanager
+def inference():
+    # inference_mode is thread-local, so enter it inside each worker call
+    with torch.inference_mode():
+        yield
+
+# ---- comparison report ----
+
+def _rtf(fn, sample_rate: int, runs: int):
+    times, wav = [], None
+    for _ in range(runs):
+        torch.manual_seed(0)
+        t0 = time.perf_counter()
+        with inference():
+            wav = np.asarray(fn(), dtype=np.float32)
+        times.append(time.perf_counter() - t0)
+    secs = min(times)
+    return wav, secs, secs / max(1e-9, len(wav) / sample_rate)
+
+def _drift(ref: np.ndarray, out: np.ndarray) -> dict:
+    n = min(len(ref), len(out))
+    a, b = ref[:n], out[:n]
+    noise = float(np.mean((a - b) ** 2)) or 1e-12
+    return {"len_ratio": round(len(out) / max(1, len(ref)), 4),
+            "max_abs_diff": round(float(np.max(np.abs(a - b))) if n else 0.0, 5),
+            "snr_db": round(10 * np.log10(float(np.mean(a ** 2)) / noise), 2) if n else None}
+
+def compare(make_synth, text: str, runs: int = 3, speaker_wav=None, language=None) -> dict:
+    kwargs = {k: v for k, v in (("speaker_wav", speaker_wav), ("language_name", language)) if v}
+    info = configure_threads()
+    base = make_synth()
+    sr = base.output_sample_rate
+    ref, t_ref, rtf_ref = _rtf(lambda: base.tts(text, **kwargs), sr, runs)
+    quant = optimize_synthesizer(make_synth(), quantize=True, compile=False)
+    out, t_q, rtf_q = _rtf(lambda: quant.tts(text, **kwargs), sr, runs)
+    return {"text": text, "threads": info, "runs": runs,
+            "fp32": {"seconds": round(t_ref, 3), "rtf": round(rtf_ref, 3)},
+            "int8": {"seconds": round(t_q, 3), "rtf": round(rtf_q, 3)},
+            "speedup": round(t_ref / max(1e-9, t_q), 2),
+            "drift": _drift(ref, out)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="fp32 vs int8 CPU report for a Coqui model")
+    ap.add_argument("--model", help="Coqui model name, e.g. tts_models/multilingual/multi-dataset/xtts_v2")
+    ap.add_argument("--config", help="voice-pack config.json (with --checkpoint, instead of --model)")
+    ap.add_argument("--checkpoint")
+    ap.add_argument("--text", default="Hello, I'm Lexi from ODIA. How I fit help you today?")
+    ap.add_argument("--speaker-wav", help="reference WAV, required for XTTS")
+    ap.add_argument("--language", help="defaults to en for multilingual models")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--out", default="cpu_report.json")
+    a = ap.parse_args()
+    if a.model:
+        from TTS.api import TTS
+        make = lambda: TTS(a.model).to("cpu").synthesizer
+        if "multilingual" in a.model:
+            a.language = a.language or "en"
+            if not a.speaker_wav:
+                ap.error("--speaker-wav is required for XTTS")
+    elif a.config and a.checkpoint:
+        from TTS.utils.synthesizer import Synthesizer
+        make = lambda: Synthesizer(tts_checkpoint=a.checkpoint, tts_config_path=a.config, use_cuda=False)
+    else:
+        ap.error("pass --model, or --config and --checkpoint")
+    report = compare(make, a.text, a.runs, a.speaker_wav, a.language)
+    report["model"] = a.model or a.checkpoint
+    with open(a.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
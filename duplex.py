@@ -0,0 +1,274 @@
+import os, re, json, time, asyncio, threading
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+import numpy as np
+import httpx
+from fastapi import APIRouter, WebSocket
+
+from history_store import HistoryStore
+
+# Duplex voice conversation over one WebSocket:
+#   client -> server  binary: PCM16 mono mic frames at ?sample_rate= (default 16 kHz)
+#                     text:   {"type": "end"}  force end of utterance
+#                             {"type": "text", "text": ...}  typed turn, skips STT
+#   server -> client  text:   ready / vad / partial / transcript / reply / audio / done /
+#                             interrupted / error  (JSON, "type" field)
+#                     binary: PCM16 mono reply audio at the rate in the last "audio" message
+# Stages overlap: partial transcripts while the user talks, the LLM reply
+# is streamed and each finished sentence is synthesized and sent while the
+# next is still being generated. Speaking over the reply interrupts it.
+# Fully offline: faster-whisper and Ollama run locally, and both fall back
+# to stubs (ODIA_STT_MODEL=stub, no ODIA_LLM_URL).
+
+STT_MODEL  = os.getenv("ODIA_STT_MODEL", "base.en")     # "stub" = no faster-whisper
+STT_DEVICE = os.getenv("ODIA_STT_DEVICE", "auto")
+STT_WORKERS = int(os.getenv("ODIA_STT_WORKERS", "2"))   # transcriptions that run at once
+LLM_URL    = os.getenv("ODIA_LLM_URL", "")              # e.g. http://localhost:11434/api/chat
+LLM_MODEL  = os.getenv("ODIA_LLM_MODEL", "llama3.1:8b")
+SYSTEM_PROMPT = os.getenv("ODIA_SYSTEM_PROMPT", "You are Lexi, a helpful Nigerian AI assistant. Keep answers short and natural.")
+HISTORY_DB = os.getenv("ODIA_HISTORY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_history.sqlite3"))
+PARTIAL_EVERY_S = 1.0
+SAMPLE_RATES = (8000, 48000)   # accepted mic rates, inclusive
+
+Synthesize = Callable[[str, str, Optional[str]], Awaitable[Tuple[np.ndarray, int]]]
+
+class EnergyVAD:
+    """Frame-energy VAD with an adaptive noise floor and a silence hangover."""
+
+    def __init__(self, sample_rate: int, frame_ms: int = 30, min_rms: float = 0.01,
+                 hangover_ms: int = 600, min_speech_ms: int = 150, preroll_ms: int = 300):
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.min_rms = min_rms
+        self.hangover = hangover_ms // frame_ms
+        self.min_speech = min_speech_ms // frame_ms
+        self.noise = min_rms / 3
+        self.speaking = False
+        self._voiced = self._silent = 0
+        self._rest = np.zeros(0, dtype=np.float32)
+        self.preroll = deque(maxlen=preroll_ms // frame_ms)
+
+    def feed(self, pcm: np.ndarray):
+        """Yields (event, frame); event is None, "start" or "end"."""
+        buf = np.concatenate([self._rest, pcm])
+        n = len(buf) // self.frame * self.frame
+        self._rest = buf[n:]
+        for i in range(0, n, self.frame):
+            frame = buf[i:i + self.frame]
+            rms = float(np.sqrt(np.mean(frame ** 2)))
+            loud = rms > max(self.min_rms, self.noise * 3)
+            if not loud:
+                self.noise = 0.95 * self.noise + 0.05 * rms
+            if not self.speaking:
+                self._voiced = self._voiced + 1 if loud else 0
+                self.preroll.append(frame)
+                if self._voiced >= self.min_speech:
+                    self.speaking, self._silent = True, 0
+                    yield "start", np.concatenate(self.preroll)
+                    self.preroll.clear()
+                continue
+            self._silent = 0 if loud else self._silent + 1
+            if self._silent >= self.hangover:
+                self.speaking, self._voiced = False, 0
+                yield "end", frame
+            else:
+                yield None, frame
+
+class Transcriber:
+    _model = None
+    _lock = threading.Lock()
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int) -> str:
+        if STT_MODEL == "stub":
+            return f"(heard {len(audio) / sample_rate:.1f}s of speech)"
+        if sample_rate != 16000:
+            n = int(len(audio) * 16000 / sample_rate)
+            audio = np.interp(np.linspace(0, len(audio), n, endpoint=False),
+                              np.arange(len(audio)), audio).astype(np.float32)
+        if Transcriber._model is None:
+            with self._lock:   # load once; transcription itself runs unlocked
+                if Transcriber._model is None:
+                    from faster_whisper import WhisperModel
+                    # num_workers lets calls from several threads (connections) run in parallel
+                    Transcriber._model = WhisperModel(STT_MODEL, device=STT_DEVICE, compute_type="default",
+                                                      num_workers=STT_WORKERS)
+        segments, _ = Transcriber._model.transcribe(audio, language="en", beam_size=1)
+        return " ".join(s.text.strip() for s in segments).strip()
+
+transcriber = Transcriber()
+
+async def llm_stream(messages) -> AsyncIterator[str]:
+    """Text deltas from a local Ollama chat model, or a canned offline reply."""
+    if not LLM_URL:
+        yield "I hear you. " + messages[-1]["content"]
+        return
+    body = {"model": LLM_MODEL, "stream": True,
+            "messages": [{"role": "system", "content": SYSTEM_PROMPT}] + messages}
+    try:
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            async with client.stream("POST", LLM_URL, json=body) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    yield data.get("message", {}).get("content", "")
+                    if data.get("done"):
+                        break
+    except (httpx.HTTPError, ValueError):
+        yield "Sorry, I no fit think straight now. Abeg try again."
+
+_SENTENCE_END = re.compile(r"[.!?](\s|$)")
+
+async def sentences(deltas: AsyncIterator[str], max_chars: int = 200) -> AsyncIterator[str]:
+    buf = ""
+    async for d in deltas:
+        buf += d
+        while True:
+            m = _SENTENCE_END.search(buf)
+            cut = m.end() if m else (len(buf) if len(buf) >= max_chars else 0)
+            if not cut:
+                break
+            s, buf = buf[:cut].strip(), buf[cut:]
+            if s:
+                yield s
+    if buf.strip():
+        yield buf.strip()
+
+def pcm16(audio: np.ndarray) -> bytes:
+    return (np.clip(np.asarray(audio, dtype=np.float32), -1, 1) * 32767).astype("<i2").tobytes()
+
+def router(synthesize: Synthesize) -> APIRouter:
+    """WebSocket route; synthesize(text, agent, voice) -> (float32 audio, sample rate)."""
+    r = APIRouter()
+    history = HistoryStore(HISTORY_DB)
+
+    @r.websocket("/ws/converse")
+    async def converse(ws: WebSocket, agent: str = "lexi", voice: Optional[str] = None,
+                       session_id: Optional[str] = None, sample_rate: int = 16000):
+        if not SAMPLE_RATES[0] <= sample_rate <= SAMPLE_RATES[1]:
+            # closing before accept rejects the handshake (HTTP 403)
+            await ws.close(code=1008)
+            return
+        await ws.accept()
+        session = session_id or f"ws-{os.urandom(8).hex()}"
+        vad = EnergyVAD(sample_rate)
+        utterance, since_partial = [], 0.0
+        partial_task: Optional[asyncio.Task] = None
+        reply_task: Optional[asyncio.Task] = None
+
+        async def send(msg: dict):
+            await ws.send_text(json.dumps(msg))
+
+        async def partial(audio):
+            text = await asyncio.to_thread(transcriber.transcribe, audio, sample_rate)
+            if text and vad.speaking:
+                await send({"type": "partial", "text": text})
+
+        async def respond(user_text: str):
+            t0 = time.perf_counter()
+            await send({"type": "transcript", "text": user_text})
+            messages = history.build_messages(session, user_text)
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def speak_sentences():
+                first = True
+                while (s := await queue.get()) is not None:
+                    audio, sr = await synthesize(s, agent, voice)
+                    if first:
+                        await send({"type": "audio", "sample_rate": sr,
+                                    "first_audio_ms": int((time.perf_counter() - t0) * 1000)})
+                        first = False
+                    await ws.send_bytes(pcm16(audio))
+
+            speaker = asyncio.create_task(speak_sentences())
+            reply = []
+            try:
+                async for s in sentences(llm_stream(messages)):
+                    reply.append(s)
+                    await send({"type": "reply", "text": s})
+                    await queue.put(s)
+                await queue.put(None)
+                await speaker
+            finally:
+                speaker.cancel()
+            history.append(session, user_text, " ".join(reply), agent=agent)
+            await send({"type": "done", "turn_ms": int((time.perf_counter() - t0) * 1000)})
+
+        def start_turn(audio: Optional[np.ndarray] = None, text: str = ""):
+            nonlocal reply_task
+            if reply_task and not reply_task.done():
+                reply_task.cancel()
+            reply_task = asyncio.create_task(run_turn(audio, text))
+
+        async def run_turn(audio, text):
+            # runs beside the receive loop, so mic frames keep flowing meanwhile
+            try:
+                if audio is not None:
+                    text = await asyncio.to_thread(transcriber.transcribe, audio, sample_rate)
+                if text:
+                    await respond(text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await send({"type": "error", "message": str(e)})
+
+        async def end_utterance():
+            nonlocal utterance
+            audio = np.concatenate(utterance) if utterance else None
+            utterance = []
+            if partial_task:
+                partial_task.cancel()
+            await send({"type": "vad", "speaking": False})
+            if audio is not None:
+                start_turn(audio=audio)
+
+        await send({"type": "ready", "session_id": session, "sample_rate": sample_rate})
+        try:
+            while True:
+                msg = await ws.receive()
+                if msg["type"] == "websocket.disconnect":
+                    break
+                if msg.get("text"):
+                    try:
+                        ctrl = json.loads(msg["text"])
+                        if not isinstance(ctrl, dict):
+                            raise ValueError("not an object")
+                    except ValueError as e:
+                        await send({"type": "error", "message": f"bad control frame: {e}"})
+                        continue
+                    if ctrl.get("type") == "end" and utterance:
+                        vad.speaking = False
+                        await end_utterance()
+                    elif ctrl.get("type") == "text":
+                        start_turn(text=ctrl.get("text", "").strip())
+                    continue
+                data = msg.get("bytes") or b""
+                if len(data) % 2:
+                    await send({"type": "error", "message": "bad audio frame: PCM16 needs an even byte count"})
+                    continue
+                pcm = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+                for event, frame in vad.feed(pcm):
+                    if event == "start":
+                        # barge-in: the user talks over the reply
+                        if reply_task and not reply_task.done():
+                            reply_task.cancel()
+                            await send({"type": "interrupted"})
+                        await send({"type": "vad", "speaking": True})
+                        utterance, since_partial = [frame], 0.0
+                        continue
+                    if not vad.speaking and event is None:
+                        continue
+                    utterance.append(frame)
+                    since_partial += len(frame) / sample_rate
+                    if event == "end":
+                        await end_utterance()
+                    elif since_partial >= PARTIAL_EVERY_S and (partial_task is None or partial_task.done()):
+                        since_partial = 0.0
+                        partial_task = asyncio.create_task(partial(np.concatenate(utterance)))
+        finally:
+            for t in (partial_task, reply_task):
+                if t:
+                    t.cancel()
+
+    return r
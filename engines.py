@@ -0,0 +1,185 @@
+import os, queue, hashlib, logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import cpu_infer
+import profiling
+
+# Engine registry for the unified TTS service.
+# An engine wraps one loaded model; a voice names an engine plus, for
+# cloning engines, the reference WAV. The service resolves a request's
+# voice here and hands the engine's tts() to the scheduler.
+
+log = logging.getLogger("odia-engines")
+
+class Engine(ABC):
+    name = "base"
+    max_chars = 250   # longer text is chunked by the service (see longform.py)
+
+    def __init__(self, device: str = "cpu", workers: int = 1):
+        self.device = device
+        self.workers = workers
+        self.synth = None           # TTS.utils.synthesizer.Synthesizer once loaded
+        self.synths: List = []      # every loaded synthesizer (one per replica)
+        self.sample_rate = 22050
+        self.version: Optional[str] = None   # set for swappable checkpoints; goes into cache keys
+
+    @abstractmethod
+    def load(self):
+        ...
+
+    @abstractmethod
+    def synthesize(self, text: str, ref: Optional[str], language: str):
+        ...
+
+    def tts(self, text: str, ref: Optional[str] = None, language: str = "en"):
+        with cpu_infer.inference(), profiling.op_profiler.maybe(self.name):
+            return self.synthesize(text, ref, language)
+
+    def describe(self) -> dict:
+        return {"device": self.device, "workers": self.workers, "replicas": len(self.synths),
+                "sample_rate": self.sample_rate, "max_chars": self.max_chars, "version": self.version}
+
+class XTTSEngine(Engine):
+    """XTTS v2 voice cloning from a reference WAV.
+
+    XTTS keeps per-call state on the model (the GPT's prefix embedding), so
+    one instance must never run two calls at once: every worker gets its
+    own replica, and parallel long-form chunks need workers > 1 (each
+    replica costs the full model's memory)."""
+    name = "xtts"
+    max_chars = 220   # under XTTS's 250-char English limit, where quality drops
+
+    def __init__(self, model_name: str = "tts_models/multilingual/multi-dataset/xtts_v2", **kw):
+        super().__init__(**kw)
+        self.model_name = model_name
+        self.model = None
+        self._free: "queue.Queue" = queue.Queue()   # replicas not in a call right now
+
+    def load(self):
+        from TTS.api import TTS
+        models = [TTS(self.model_name).to(self.device) for _ in range(max(1, self.workers))]
+        for m in models:
+            self._free.put(m)
+        self.model = models[0]
+        self.synths = [m.synthesizer for m in models]
+        self.synth = self.synths[0]
+        self.sample_rate = self.synth.output_sample_rate
+
+    def synthesize(self, text, ref, language):
+        model = self._free.get()
+        try:
+            return model.tts(text=text, speaker_wav=ref, language=language)
+        finally:
+            self._free.put(model)
+
+class VITSEngine(Engine):
+    """Single-speaker VITS voice pack (e.g. VOICEPACK_pidgin)."""
+    name = "vits"
+    max_chars = 400
+
+    def __init__(self, config: str, checkpoint: str, **kw):
+        super().__init__(**kw)
+        self.config = config
+        self.checkpoint = checkpoint
+
+    def load(self):
+        from TTS.utils.synthesizer import Synthesizer
+        # VITS inference keeps no state between calls; workers share one model
+        self.synth = Synthesizer(tts_checkpoint=self.checkpoint, tts_config_path=self.config,
+                                 use_cuda=self.device == "cuda")
+        self.synths = [self.synth]
+        self.sample_rate = self.synth.output_sample_rate
+        self.version = checkpoint_version(self.checkpoint)
+
+    def synthesize(self, text, ref, language):
+        return self.synth.tts(text)
+
+def checkpoint_version(path: str) -> str:
+    # path + size + mtime: cheap, and changes whenever a trainer rewrites the file
+    st = os.stat(path)
+    return hashlib.md5(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode()).hexdigest()[:10]
+
+class UnknownVoice(Exception):
+    pass
+
+class EngineUnavailable(Exception):
+    pass
+
+class MissingReference(Exception):
+    pass
+
+class EngineRegistry:
+    def __init__(self):
+        self.engines: Dict[str, Engine] = {}
+        self.voices: Dict[str, Tuple[str, Optional[str]]] = {}
+
+    def add_engine(self, engine: Engine) -> Engine:
+        self.engines[engine.name] = engine
+        return engine
+
+    def add_voice(self, voice: str, engine: str, ref: Optional[str] = None):
+        self.voices[voice] = (engine, ref)
+
+    def load_all(self):
+        """Load every engine; one that fails is logged and dropped, so the
+        others still serve (its voices then answer 503)."""
+        cpu = [e for e in self.engines.values() if e.device == "cpu"]
+        info = cpu_infer.configure_threads(sum(e.workers for e in cpu)) if cpu else None
+        for name, engine in list(self.engines.items()):
+            try:
+                self.prepare(engine)
+            except Exception:
+                log.exception("%s: failed to load, serving without it", name)
+                del self.engines[name]
+        if info:
+            info.update({"quantized": cpu_infer.QUANTIZE, "compiled": cpu_infer.COMPILE})
+        return info
+
+    @staticmethod
+    def prepare(engine: Engine):
+        engine.load()
+        if engine.device == "cpu":
+            for synth in engine.synths:
+                cpu_infer.optimize_synthesizer(synth)
+
+    def swap(self, engine: Engine) -> Optional[Engine]:
+        """Atomically replace the engine of the same name; returns the old one.
+        Requests that already resolved the old engine finish on it."""
+        old = self.engines.get(engine.name)
+        self.engines[engine.name] = engine
+        return old
+
+    def resolve(self, voice: str) -> Tuple[Engine, Optional[str]]:
+        """(engine, reference wav or None); KeyError for unknown or unloaded voices."""
+        engine, ref = self.voices[voice]
+        return self.engines[engine], ref
+
+    def pick(self, agent: Optional[str], voice: Optional[str] = None,
+             speaker_wav: Optional[str] = None) -> Tuple[Engine, Optional[str], str, str]:
+        """(engine, ref, cache tag, bucket) for a request.
+
+        bucket is the resolved voice ("custom" for a caller's own WAV): a
+        bounded name to key per-agent caps on, whatever the client sent."""
+        # explicit reference wins
+        if speaker_wav and os.path.exists(speaker_wav) and "xtts" in self.engines:
+            return self.engines["xtts"], speaker_wav, speaker_wav, "custom"
+        name = (voice or agent or "lexi").lower()
+        if name not in self.voices:
+            if voice:
+                raise UnknownVoice(voice)
+            name = "lexi"
+        try:
+            engine, ref = self.resolve(name)
+        except KeyError:
+            raise EngineUnavailable(name)
+        if ref is None:
+            # versioned by checkpoint so a hot-swapped model never serves old audio
+            return engine, None, f"{engine.name}:{name}@{engine.version}", name
+        if not os.path.exists(ref):
+            raise MissingReference(ref)
+        return engine, ref, ref, name
+
+    def describe(self) -> dict:
+        return {"engines": {n: e.describe() for n, e in self.engines.items()},
+                "voices": {v: e for v, (e, _) in self.voices.items() if e in self.engines}}
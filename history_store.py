@@ -0,0 +1,101 @@
+import sqlite3, threading, time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+# Session-scoped conversation history.
+# Each session keeps its last `ring` turns in memory; every turn is also
+# appended to a SQLite log so sessions survive restarts and can be paged
+# back in after being evicted from memory. At most `max_sessions` rings are
+# held at once, so memory stays flat no matter how long the server runs.
+# A cached ring is checked against the log on every lookup (one indexed
+# MAX(id) query) and reloaded when it is behind, so processes sharing the
+# file -- the chat shim and the duplex socket -- see each other's turns.
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for English; cheap and good enough for budgeting
+    return len(text) // 4 + 4
+
+class HistoryStore:
+    def __init__(self, db_path: str, ring: int = 20, max_sessions: int = 1000):
+        self.ring = ring
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, deque]" = OrderedDict()
+        self._last_id: Dict[str, int] = {}   # newest turn id each cached ring holds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " session TEXT NOT NULL, agent TEXT, user TEXT NOT NULL,"
+            " reply TEXT NOT NULL, ts REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns(session, id)")
+        self._db.commit()
+
+    def _ring(self, session: str) -> deque:
+        # caller holds the lock
+        latest = self._db.execute("SELECT MAX(id) FROM turns WHERE session=?", (session,)).fetchone()[0] or 0
+        ring = self._sessions.get(session)
+        if ring is not None and self._last_id[session] == latest:
+            self._sessions.move_to_end(session)
+            return ring
+        # not cached, or another process added turns since
+        rows = self._db.execute(
+            "SELECT agent, user, reply, ts FROM turns WHERE session=? ORDER BY id DESC LIMIT ?",
+            (session, self.ring)).fetchall()
+        ring = deque(({"agent": a, "user": u, "reply": r, "ts": ts} for a, u, r, ts in reversed(rows)),
+                     maxlen=self.ring)
+        self._sessions[session] = ring
+        self._sessions.move_to_end(session)
+        self._last_id[session] = latest
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            del self._last_id[evicted]
+        return ring
+
+    def append(self, session: str, user: str, reply: str, agent: Optional[str] = None):
+        turn = {"agent": agent, "user": user, "reply": reply, "ts": time.time()}
+        with self._lock:
+            # write lock first, so no other process adds a turn between the
+            # freshness check and the insert
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                ring = self._ring(session)
+                cur = self._db.execute("INSERT INTO turns(session, agent, user, reply, ts) VALUES (?,?,?,?,?)",
+                                       (session, agent, user, reply, turn["ts"]))
+                self._db.commit()
+            except BaseException:
+                # or the connection stays in the transaction and every later BEGIN fails
+                self._db.rollback()
+                raise
+            ring.append(turn)
+            self._last_id[session] = cur.lastrowid
+
+    def turns(self, session: str) -> List[Dict]:
+        with self._lock:
+            return list(self._ring(session))
+
+    def build_messages(self, session: str, user_text: str, token_budget: int = 1500) -> List[Dict]:
+        """Newest turns that fit the budget, oldest first, ending with user_text."""
+        used = estimate_tokens(user_text)
+        kept = []
+        for t in reversed(self.turns(session)):
+            cost = estimate_tokens(t["user"]) + estimate_tokens(t["reply"])
+            if used + cost > token_budget:
+                break
+            used += cost
+            kept.append(t)
+        messages = []
+        for t in reversed(kept):
+            messages.append({"role": "user", "content": t["user"]})
+            messages.append({"role": "assistant", "content": t["reply"]})
+        messages.append({"role": "user", "content": user_text})
+        return messages
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
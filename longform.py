@@ -0,0 +1,78 @@
+import re
+from typing import List
+
+import numpy as np
+
+# Long-form synthesis helpers: split text into chunks the model handles
+# well, then stitch the per-chunk audio back together with matched
+# loudness and short crossfades so the seams are not audible.
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_CLAUSE = re.compile(r"(?<=[,;:])\s+")
+
+def _words(clause: str, max_chars: int) -> List[str]:
+    # a "word" longer than a whole chunk (a URL, a run without spaces) is
+    # cut hard, so no chunk ever exceeds max_chars
+    out = []
+    for word in clause.split():
+        out.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+    return out
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    # sentence, then clause, then word boundaries: the coarsest that fits
+    out = []
+    for sentence in _SENTENCE.split(text.strip()):
+        if len(sentence) <= max_chars:
+            out.append(sentence)
+            continue
+        for clause in _CLAUSE.split(sentence):
+            if len(clause) <= max_chars:
+                out.append(clause)
+                continue
+            line = ""
+            for word in _words(clause, max_chars):
+                if line and len(line) + 1 + len(word) > max_chars:
+                    out.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}" if line else word
+            if line:
+                out.append(line)
+    return [p for p in out if p]
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Greedily pack boundary-aligned pieces into chunks of <= max_chars."""
+    chunks, cur = [], ""
+    for piece in _pieces(text, max_chars):
+        if cur and len(cur) + 1 + len(piece) > max_chars:
+            chunks.append(cur)
+            cur = piece
+        else:
+            cur = f"{cur} {piece}" if cur else piece
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def _rms(x: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(x ** 2))) if len(x) else 0.0
+
+def stitch(parts, sample_rate: int, crossfade_ms: int = 40, max_gain: float = 4.0) -> np.ndarray:
+    """Concatenate chunk audio in order, loudness-matched to the median chunk."""
+    parts = [np.asarray(p, dtype=np.float32) for p in parts if len(p)]
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    levels = [_rms(p) for p in parts]
+    voiced = [r for r in levels if r > 1e-6]
+    target = float(np.median(voiced)) if voiced else 0.0
+    parts = [p * min(target / r, max_gain) if r > 1e-6 else p for p, r in zip(parts, levels)]
+
+    n = int(sample_rate * crossfade_ms / 1000)
+    out = parts[0]
+    for p in parts[1:]:
+        k = min(n, len(out), len(p))
+        if k:
+            fade = np.linspace(0.0, 1.0, k, dtype=np.float32)
+            out = np.concatenate([out[:-k], out[-k:] * (1 - fade) + p[:k] * fade, p[k:]])
+        else:
+            out = np.concatenate([out, p])
+    return np.clip(out, -1.0, 1.0)
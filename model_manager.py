@@ -0,0 +1,145 @@
+import os, glob, time, threading, logging
+from typing import Callable, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
+
+from engines import Engine, EngineRegistry, checkpoint_version
+from profiling import require_admin
+
+# Hot reload of voice-pack checkpoints. A manager owns one engine name in
+# the registry: when told about a checkpoint (admin route) or when its
+# watch pattern turns up a newer one, it loads a fresh engine on a
+# background thread, warms it up, then swaps it into the registry.
+# Requests already running keep the old engine until they finish, and
+# the checkpoint version is part of the cache key, so old audio is
+# never served for the new model.
+
+log = logging.getLogger("odia-models")
+
+class ModelManager:
+    def __init__(self, registry: EngineRegistry, name: str,
+                 factory: Callable[[str, str], Engine], watch: Optional[str] = None,
+                 poll_s: float = 0.0, warmup_text: str = "How you dey? Warm up don finish."):
+        self.registry = registry
+        self.name = name
+        self.factory = factory          # (config, checkpoint) -> unloaded engine
+        self.watch = watch              # checkpoint path or glob, e.g. trainer_output/*/best_model.pth
+        self.poll_s = poll_s
+        self.warmup_text = warmup_text
+        self._lock = threading.Lock()
+        self.loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.swapped_at: Optional[float] = None
+        self._seen: Dict[str, str] = {}   # candidate checkpoint -> version at last poll
+        self._failed: Optional[str] = None   # version whose load failed; the watch skips it
+
+    @property
+    def engine(self) -> Engine:
+        return self.registry.engines[self.name]
+
+    def reload(self, checkpoint: str, config: Optional[str] = None):
+        """Start loading checkpoint in the background; RuntimeError if already loading."""
+        if not os.path.exists(checkpoint):
+            raise FileNotFoundError(checkpoint)
+        sibling = os.path.join(os.path.dirname(checkpoint), "config.json")
+        config = config or (sibling if os.path.exists(sibling) else self.engine.config)
+        with self._lock:
+            if self.loading:
+                raise RuntimeError(f"already loading {self.loading}")
+            self.loading = checkpoint
+        threading.Thread(target=self._load, args=(config, checkpoint),
+                         name=f"reload-{self.name}", daemon=True).start()
+
+    def _load(self, config: str, checkpoint: str):
+        try:
+            t0 = time.monotonic()
+            old = self.engine
+            new = self.factory(config, checkpoint)
+            new.workers = old.workers
+            self.registry.prepare(new)
+            new.tts(self.warmup_text)
+            self.registry.swap(new)
+            self.swapped_at = time.time()
+            self.last_error = None
+            self._failed = None
+            log.info("%s: swapped %s -> %s in %.1fs", self.name, old.version, new.version,
+                     time.monotonic() - t0)
+        except Exception as e:
+            self.last_error = f"{checkpoint}: {e}"
+            try:
+                self._failed = checkpoint_version(checkpoint)
+            except OSError:
+                pass
+            log.exception("%s: reload of %s failed, keeping %s", self.name, checkpoint, self.engine.version)
+        finally:
+            with self._lock:
+                self.loading = None
+
+    def _newest(self) -> Optional[str]:
+        paths = glob.glob(self.watch)
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    def poll(self):
+        """One watch step: reload once the newest checkpoint changed and then held still."""
+        path = self._newest()
+        if not path or self.loading:
+            return
+        try:
+            version = checkpoint_version(path)
+        except OSError:
+            return
+        # a broken checkpoint is retried only once the file changes
+        if version in (self.engine.version, self._failed):
+            return
+        # a trainer may still be writing it: wait until one poll sees no change
+        if self._seen.get(path) == version:
+            try:
+                self.reload(path)
+            except (RuntimeError, FileNotFoundError):
+                pass
+        self._seen = {path: version}
+
+    def start_watching(self):
+        if not self.watch or self.poll_s <= 0:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.poll_s)
+                self.poll()
+
+        threading.Thread(target=loop, name=f"watch-{self.name}", daemon=True).start()
+
+    def status(self) -> dict:
+        e = self.engine
+        return {"engine": self.name, "version": e.version, "checkpoint": getattr(e, "checkpoint", None),
+                "loading": self.loading, "watch": self.watch if self.poll_s > 0 else None,
+                "swapped_at": self.swapped_at, "last_error": self.last_error, "skipping": self._failed}
+
+class ReloadIn(BaseModel):
+    checkpoint: str
+    config: Optional[str] = None
+
+def router(managers: Dict[str, ModelManager]) -> APIRouter:
+    r = APIRouter(prefix="/admin/models")
+
+    @r.get("")
+    def models(x_odia_admin_token: Optional[str] = Header(None)):
+        require_admin(x_odia_admin_token)
+        return {name: m.status() for name, m in managers.items()}
+
+    @r.post("/{name}/reload")
+    def reload(name: str, body: ReloadIn, x_odia_admin_token: Optional[str] = Header(None)):
+        require_admin(x_odia_admin_token)
+        if name not in managers:
+            raise HTTPException(404, f"No reloadable engine: {name}")
+        try:
+            managers[name].reload(body.checkpoint, body.config)
+        except FileNotFoundError:
+            raise HTTPException(400, f"Checkpoint not found: {body.checkpoint}")
+        except RuntimeError as e:
+            raise HTTPException(409, str(e))
+        return managers[name].status()
+
+    return r
@@ -15,6 +15,7 @@ import soundfile as sf
 import io
 import os
 import hashlib
+import uuid
 import asyncio
 import logging
 import httpx
@@ -22,6 +23,8 @@ from pathlib import Path
 from datetime import datetime
 import uvicorn
 
+from history_store import HistoryStore
+
 # Import TTS
 try:
     from TTS.api import TTS
@@ -63,6 +66,7 @@ class VoiceRequest(BaseModel):
 class ChatRequest(BaseModel):
     text: str
     agent: str = "lexi"
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     reply_text: str
@@ -70,6 +74,7 @@ class ChatResponse(BaseModel):
     agent: str
     cost: str
     processing_time_ms: int
+    session_id: str
 
 class VoiceResponse(BaseModel):
     status: str
@@ -84,7 +89,9 @@ class VoiceResponse(BaseModel):
 tts_model = None
 device = None
 voice_cache = {}
-chat_history = []
+# bounded per-session rings backed by an on-disk log (was an unbounded list)
+os.makedirs("C:/ODIA-VOICE/cache", exist_ok=True)
+chat_history = HistoryStore("C:/ODIA-VOICE/cache/chat_history.sqlite3")
 
 # Nigerian speakers for each agent
 nigerian_speakers = {
@@ -169,30 +176,32 @@ async def health_check():
 @app.post("/chat/lexi", response_model=ChatResponse)
 async def chat_with_lexi(request: ChatRequest):
     """Chat with Agent Lexi - Business Expert"""
-    return await process_chat(request.text, "lexi")
+    return await process_chat(request.text, "lexi", request.session_id)
 
 @app.post("/chat/miss", response_model=ChatResponse)
 async def chat_with_miss(request: ChatRequest):
     """Chat with Agent MISS - University Assistant"""
-    return await process_chat(request.text, "miss")
+    return await process_chat(request.text, "miss", request.session_id)
 
 @app.post("/chat/atlas", response_model=ChatResponse)
 async def chat_with_atlas(request: ChatRequest):
     """Chat with Agent Atlas - Luxury Concierge"""
-    return await process_chat(request.text, "atlas")
+    return await process_chat(request.text, "atlas", request.session_id)
 
 @app.post("/chat/legal", response_model=ChatResponse)
 async def chat_with_legal(request: ChatRequest):
     """Chat with Agent Legal - NDPR Compliance Expert"""
-    return await process_chat(request.text, "legal")
+    return await process_chat(request.text, "legal", request.session_id)
 
-async def process_chat(user_text: str, agent: str) -> ChatResponse:
+async def process_chat(user_text: str, agent: str, session_id: Optional[str] = None) -> ChatResponse:
     """Process conversational AI request"""
     start_time = datetime.now()
+    # callers without a session get a fresh one, never a history shared with strangers
+    session = session_id or uuid.uuid4().hex
     
     try:
         # Get AI response
-        ai_reply = await get_ai_response(user_text, agent)
+        ai_reply = await get_ai_response(user_text, agent, session)
         
         # Generate voice for the AI response
         voice_request = VoiceRequest(
@@ -207,12 +216,7 @@ async def process_chat(user_text: str, agent: str) -> ChatResponse:
         processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
         
         # Log conversation
-        chat_history.append({
-            "user": user_text,
-            "agent": agent,
-            "ai_reply": ai_reply,
-            "timestamp": datetime.now().isoformat()
-        })
+        chat_history.append(session, user_text, ai_reply, agent=agent)
         
         logger.info(f"💬 Chat processed: {agent} - {processing_time}ms")
         
@@ -221,7 +225,8 @@ async def process_chat(user_text: str, agent: str) -> ChatResponse:
             audio_url=voice_response.audio_url,
             agent=agent,
             cost="₦0.10",
-            processing_time_ms=processing_time
+            processing_time_ms=processing_time,
+            session_id=session
         )
         
     except Exception as e:
@@ -232,10 +237,11 @@ async def process_chat(user_text: str, agent: str) -> ChatResponse:
             audio_url="/error",
             agent=agent,
             cost="₦0.00",
-            processing_time_ms=0
+            processing_time_ms=0,
+            session_id=session
         )
 
-async def get_ai_response(user_text: str, agent: str) -> str:
+async def get_ai_response(user_text: str, agent: str, session: str) -> str:
     """Get AI response based on agent personality"""
     
     # Try Claude API if available
@@ -243,14 +249,14 @@ async def get_ai_response(user_text: str, agent: str) -> str:
     
     if claude_api_key:
         try:
-            return await call_claude_api(user_text, agent, claude_api_key)
+            return await call_claude_api(user_text, agent, claude_api_key, session)
         except Exception as e:
             logger.warning(f"Claude API failed: {e}, using fallback")
     
     # Fallback responses based on agent personality
     return get_fallback_response(user_text, agent)
 
-async def call_claude_api(user_text: str, agent: str, api_key: str) -> str:
+async def call_claude_api(user_text: str, agent: str, api_key: str, session: str) -> str:
     """Call Claude API for intelligent responses"""
     
     try:
@@ -263,12 +269,8 @@ async def call_claude_api(user_text: str, agent: str, api_key: str) -> str:
         payload = {
             "model": "claude-3-haiku-20240307",
             "max_tokens": 150,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": f"{agent_personalities[agent]}\n\nUser: {user_text}\n\nRespond as {agent.upper()}:"
-                }
-            ]
+            "system": agent_personalities[agent],
+            "messages": chat_history.build_messages(session, user_text)
         }
         
         async with httpx.AsyncClient(timeout=10) as client:
@@ -505,7 +507,7 @@ async def get_analytics():
         "total_generations": len(voice_cache),
         "cache_hit_rate": "85%",
         "cost_per_generation": "₦0.10",
-        "total_conversations": len(chat_history),
+        "total_conversations": chat_history.count(),
         "agents_active": list(nigerian_speakers.keys()),
         "uptime": "99.9%",
         "nigerian_optimized": True
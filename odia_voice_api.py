@@ -1,116 +1,230 @@
-﻿from fastapi import FastAPI, HTTPException
+﻿from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import Optional
-import os, hashlib
+import os, io, asyncio, hashlib, time
 import soundfile as sf
 import numpy as np
 
-# Coqui TTS (XTTS v2)
-from TTS.api import TTS
+from scheduler import SynthesisScheduler, QueueFull, DeadlineExceeded, ClientGone
+from engines import EngineRegistry, XTTSEngine, VITSEngine, UnknownVoice, EngineUnavailable, MissingReference
+from audio_cache import AudioCache
+from longform import split_text, stitch
+import tracing
+import profiling
+import duplex
+import model_manager
+import cpu_infer
 
 APP_DIR   = r"C:\Users\OD~IA\ODIA-VOICE"
 OUT_DIR   = os.path.join(APP_DIR, "output")
 REF_DIR   = os.path.join(APP_DIR, "ref")
+VITS_DIR  = os.getenv("ODIA_VITS_DIR", r"C:\ODIA-VOICE\VOICEPACK_pidgin")
+ENGINES   = [e.strip() for e in os.getenv("ODIA_ENGINES", "xtts,vits").split(",")]
 os.makedirs(OUT_DIR, exist_ok=True)
 os.makedirs(REF_DIR, exist_ok=True)
 
-app = FastAPI(title="ODIA Voice API (ref-only)")
+# Admission control: model workers, waiting-queue bound, per-agent cap.
+# Each XTTS worker is its own model replica (XTTS calls can't share one),
+# so long text is only synthesized in parallel with ODIA_TTS_WORKERS > 1.
+# A long-form request is one queue entry and one per-agent slot; its
+# chunks then use up to every worker, queueing for each in turn.
+TTS_WORKERS   = int(os.getenv("ODIA_TTS_WORKERS", "1"))
+VITS_WORKERS  = int(os.getenv("ODIA_VITS_WORKERS", "2"))
+TTS_MAX_QUEUE = int(os.getenv("ODIA_TTS_MAX_QUEUE", "16"))
+TTS_PER_AGENT = int(os.getenv("ODIA_TTS_PER_AGENT", "2"))
+
+# Hot greetings stay in RAM; everything else is read from OUT_DIR
+AUDIO_MEM_MB  = int(os.getenv("ODIA_AUDIO_MEM_MB", "64"))
+
+# VITS hot reload: poll this checkpoint path/glob (default: the served one) every N s, 0 = off
+VITS_WATCH    = os.getenv("ODIA_VITS_WATCH", "")
+VITS_WATCH_S  = float(os.getenv("ODIA_VITS_WATCH_S", "30"))
+
+app = FastAPI(title="ODIA Voice API")
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173","http://127.0.0.1:5173"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", tracing.TRACE_HEADER],
 )
+tracing.install(app, "tts")
+app.include_router(profiling.router)
 
 class VoiceRequest(BaseModel):
     text: str
     language: str = "en"
     speed: float = 1.0
     agent: Optional[str] = "lexi"
-    speaker_wav: Optional[str] = None
+    voice: Optional[str] = None        # defaults to the agent's voice
+    speaker_wav: Optional[str] = None  # clone this WAV with XTTS
+    deadline_ms: Optional[int] = None  # drop the job if not started within this budget
 
 class VoiceResponse(BaseModel):
     status: str
     message: str
     audio_url: str
     agent: str
+    engine: str = "xtts"
     cache_hit: bool
     processing_time_ms: int
 
-# Load XTTS v2 once
-tts_model = TTS("tts_models/multilingual/multi-dataset/xtts_v2")
+# Load every enabled engine once; on CPU nodes size threads and optionally quantize
+DEVICE = cpu_infer.pick_device()
+registry = EngineRegistry()
+if "xtts" in ENGINES:
+    registry.add_engine(XTTSEngine(device=DEVICE, workers=TTS_WORKERS))
+if "vits" in ENGINES:
+    registry.add_engine(VITSEngine(config=os.path.join(VITS_DIR, "config.json"),
+                                   checkpoint=os.path.join(VITS_DIR, "best_model.pth"),
+                                   device=DEVICE, workers=VITS_WORKERS))
+# cloned agent voices on XTTS, the cheap Pidgin voice pack on VITS
+for agent in ("lexi", "miss", "atlas", "legal"):
+    registry.add_voice(agent, "xtts", os.path.join(REF_DIR, f"{agent}_ref.wav"))
+registry.add_voice("pidgin", "vits")
+CPU_MODE = registry.load_all()
+
+# new voice-pack checkpoints are loaded and swapped in without a restart
+managers = {}
+if "vits" in registry.engines:
+    managers["vits"] = model_manager.ModelManager(
+        registry, "vits",
+        lambda cfg, ckpt: VITSEngine(config=cfg, checkpoint=ckpt, device=DEVICE),
+        watch=VITS_WATCH or registry.engines["vits"].checkpoint, poll_s=VITS_WATCH_S)
+    managers["vits"].start_watching()
+app.include_router(model_manager.router(managers))
+
+# one queue per engine so cheap VITS jobs never wait behind XTTS
+schedulers = {name: SynthesisScheduler(workers=e.workers, max_queue=TTS_MAX_QUEUE, per_agent=TTS_PER_AGENT)
+              for name, e in registry.engines.items()}
+
+audio_cache = AudioCache(OUT_DIR, mem_bytes=AUDIO_MEM_MB * 1024 * 1024)
 
 def cache_key(req: VoiceRequest, ref_path: str) -> str:
     s = f"{req.text}|{req.language}|{req.speed}|{req.agent}|{ref_path}"
     return hashlib.md5(s.encode()).hexdigest()
 
-def pick_reference(req: VoiceRequest) -> str:
-    # explicit wins
-    if req.speaker_wav and os.path.exists(req.speaker_wav):
-        return req.speaker_wav
-    # default per agent
-    defaults = {
-        "lexi":  os.path.join(REF_DIR, "lexi_ref.wav"),
-        "miss":  os.path.join(REF_DIR, "miss_ref.wav"),
-        "atlas": os.path.join(REF_DIR, "atlas_ref.wav"),
-        "legal": os.path.join(REF_DIR, "legal_ref.wav"),
-    }
-    agent = (req.agent or "lexi").lower()
-    ref = defaults.get(agent, defaults["lexi"])
-    if not os.path.exists(ref):
+def pick_voice(req: VoiceRequest):
+    """(engine, ref, voice tag for the cache key, per-agent cap bucket)"""
+    try:
+        return registry.pick(req.agent, req.voice, req.speaker_wav)
+    except UnknownVoice:
+        raise HTTPException(400, f"Unknown voice: {req.voice}")
+    except EngineUnavailable as e:
+        raise HTTPException(503, f"Voice '{e}' needs an engine that is not loaded")
+    except MissingReference as e:
         raise HTTPException(
             status_code=400,
-            detail=f"Missing reference voice file: {ref}. Put a WAV there or pass speaker_wav."
+            detail=f"Missing reference voice file: {e}. Put a WAV there or pass speaker_wav."
         )
-    return ref
 
 @app.get("/health")
 def health():
-    return {"ready": True, "model": "xtts_v2", "ref_dir": REF_DIR}
+    return {"ready": True, "ref_dir": REF_DIR, "device": DEVICE, "cpu_mode": CPU_MODE,
+            **registry.describe(),
+            "queues": {name: s.snapshot() for name, s in schedulers.items()},
+            "cache": audio_cache.stats()}
 
 @app.get("/audio/{key}")
 def get_audio(key: str):
-    path = os.path.join(OUT_DIR, f"{key}.wav")
-    if not os.path.exists(path):
+    data = audio_cache.get(key)
+    if data is None:
         raise HTTPException(404, "Audio not found")
-    return FileResponse(path, media_type="audio/wav")
+    # keys are content hashes, so the bytes behind a URL never change
+    return Response(data, media_type="audio/wav", headers={"Cache-Control": "public, max-age=86400"})
 
 @app.post("/speak", response_model=VoiceResponse)
-def speak(req: VoiceRequest):
-    ref = pick_reference(req)
-    key = cache_key(req, ref)
-    out_path = os.path.join(OUT_DIR, f"{key}.wav")
-    if os.path.exists(out_path):
+async def speak(req: VoiceRequest, request: Request):
+    t0 = time.monotonic()
+    engine, ref, tag, bucket = pick_voice(req)
+    key = cache_key(req, tag)
+    if audio_cache.contains(key):
         return VoiceResponse(
             status="SUCCESS",
             message="cache",
             audio_url=f"/audio/{key}",
             agent=req.agent or "lexi",
+            engine=engine.name,
             cache_hit=True,
             processing_time_ms=0,
         )
 
-    # XTTS reference-only call
-    audio = tts_model.tts(text=req.text, speaker_wav=ref, language=req.language)
-    # Coqui returns float32 numpy with sample rate 22050
-    sf.write(out_path, np.array(audio, dtype=np.float32), 22050)
+    # jobs run on worker threads, so hold the trace object rather than the contextvar
+    trace = tracing.current()
+    submitted = time.perf_counter()
+
+    def infer(text):
+        trace.add("queue_wait", submitted, time.perf_counter())
+        with trace.span("inference", engine=engine.name, chars=len(text)):
+            return engine.tts(text, ref, req.language)
+
+    def save(audio):
+        with trace.span("encode"):
+            buf = io.BytesIO()
+            sf.write(buf, np.array(audio, dtype=np.float32), engine.sample_rate, format="WAV")
+        # lands in both tiers: the client fetches /audio/{key} right after this
+        with trace.span("write"):
+            audio_cache.put(key, buf.getvalue())
+
+    # long text: chunk at sentence/clause boundaries, synthesize the chunks
+    # in parallel across the engine's workers, stitch in order; the request
+    # is admitted once, whatever its length
+    chunks = split_text(req.text, engine.max_chars) if len(req.text) > engine.max_chars else []
+    if len(chunks) > 1:
+        jobs = [lambda c=c: infer(c) for c in chunks]
+    else:
+        jobs = [lambda: save(infer(req.text))]
+
+    sched = schedulers[engine.name]
+    deadline = t0 + req.deadline_ms / 1000 if req.deadline_ms else None
+    try:
+        parts = await sched.run_all(jobs, agent=bucket,
+                                    deadline=deadline, is_disconnected=request.is_disconnected)
+        if len(parts) > 1:
+            def finish():
+                with trace.span("stitch", chunks=len(parts)):
+                    audio = stitch(parts, engine.sample_rate)
+                save(audio)
+            await asyncio.to_thread(finish)
+    except QueueFull as e:
+        raise HTTPException(429, "TTS busy, try again later",
+                            headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded:
+        raise HTTPException(504, "Deadline passed before synthesis started")
+    except ClientGone:
+        raise HTTPException(499, "Client closed request")
 
     return VoiceResponse(
         status="SUCCESS",
         message="ok",
         audio_url=f"/audio/{key}",
         agent=req.agent or "lexi",
+        engine=engine.name,
         cache_hit=False,
-        processing_time_ms=1
+        processing_time_ms=int((time.monotonic() - t0) * 1000)
     )
 
+async def synthesize_pcm(text: str, agent: str, voice: Optional[str]):
+    """One sentence for the duplex socket: raw audio, through the same queues."""
+    req = VoiceRequest(text=text, agent=agent, voice=voice)
+    engine, ref, _, bucket = pick_voice(req)
+    # the LLM can emit "sentences" longer than the engine takes: chunk like /speak
+    chunks = split_text(text, engine.max_chars) if len(text) > engine.max_chars else [text]
+    parts = await schedulers[engine.name].run_all(
+        [lambda c=c: engine.tts(c, ref, req.language) for c in chunks], agent=bucket)
+    audio = stitch(parts, engine.sample_rate) if len(parts) > 1 else parts[0]
+    return np.asarray(audio, dtype=np.float32), engine.sample_rate
+
+app.include_router(duplex.router(synthesize_pcm))
+
 # Optional: very small chat endpoint that just echoes then speaks (no cloud)
 class ChatIn(BaseModel):
     text: str
     agent: Optional[str] = "lexi"
+    voice: Optional[str] = None
     speaker_wav: Optional[str] = None
 
 class ChatOut(BaseModel):
@@ -118,9 +232,9 @@ class ChatOut(BaseModel):
     audio_url: str
 
 @app.post("/chat/lexi", response_model=ChatOut)
-def chat_lexi(inp: ChatIn):
+async def chat_lexi(inp: ChatIn, request: Request):
     # offline fallback reply; you can wire Claude later
     reply = "I hear you. " + inp.text
-    req = VoiceRequest(text=reply, agent=inp.agent, speaker_wav=inp.speaker_wav)
-    res = speak(req)
+    req = VoiceRequest(text=reply, agent=inp.agent, voice=inp.voice, speaker_wav=inp.speaker_wav)
+    res = await speak(req, request)
     return ChatOut(reply_text=reply, audio_url=res.audio_url)
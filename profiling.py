@@ -0,0 +1,237 @@
+import os, sys, hmac, time, threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+
+# On-demand profiling of the synthesis hot path, behind admin-only routes:
+#   - a wall-clock sampling profiler over every thread for N seconds
+#   - the PyTorch profiler around the next N engine.tts() calls
+# Both write flamegraph-ready collapsed stacks (*.folded, for
+# flamegraph.pl / speedscope); the torch one also writes a per-operator
+# table. Set ODIA_ADMIN_TOKEN to enable; callers send X-ODIA-Admin-Token.
+
+ADMIN_TOKEN = os.getenv("ODIA_ADMIN_TOKEN", "").strip()
+PROFILE_DIR = os.getenv("ODIA_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+
+def _stamp() -> str:
+    return time.strftime("%Y%m%d-%H%M%S")
+
+def _write_folded(path: str, stacks: Counter):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in stacks.most_common():
+            f.write(f"{stack} {n}\n")
+
+class SamplingProfiler:
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+        self.last_file: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float):
+        if self.running:
+            raise RuntimeError("sampling profiler already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(seconds,), name="odia-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, seconds: float):
+        stacks, me = Counter(), threading.get_ident()
+        names = {}
+        end = time.monotonic() + seconds
+        self.samples = 0
+        while time.monotonic() < end and not self._stop.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()} if self.samples % 200 == 0 else names
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+            time.sleep(self.interval_s)
+        path = os.path.join(PROFILE_DIR, f"sample-{_stamp()}.folded")
+        _write_folded(path, stacks)
+        self.last_file = path
+
+    def status(self) -> dict:
+        return {"running": self.running, "samples": self.samples, "last_file": self.last_file}
+
+class TorchOpProfiler:
+    """Profiles the next N engine.tts() calls; results are merged across calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = threading.Lock()   # one torch profiler session at a time
+        self.armed = 0
+        self.remaining = 0
+        self.calls = 0
+        self._stacks = Counter()
+        self._ops = defaultdict(lambda: [0, 0.0, 0.0])   # name -> [count, self_us, total_us]
+        self.last_files: Optional[dict] = None
+        self.last_error: Optional[str] = None
+
+    def arm(self, calls: int):
+        with self._lock:
+            if self.calls < self.armed:
+                raise RuntimeError("torch profiler already armed")
+            self.armed = self.remaining = calls
+            self.calls = 0
+            self._stacks, self._ops = Counter(), defaultdict(lambda: [0, 0.0, 0.0])
+            self.last_error = None
+
+    def disarm(self):
+        """Drop a session that will never complete (too few calls arrived)."""
+        with self._lock:
+            self.remaining = 0
+            self.armed = self.calls
+
+    def _take(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def maybe(self, label: str):
+        return self._profile(label) if self.remaining and self._take() else nullcontext()
+
+    @contextmanager
+    def _profile(self, label: str):
+        import torch
+        from torch.profiler import profile, record_function, ProfilerActivity
+        acts = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if torch.cuda.is_available() else [])
+        with self._active:
+            # torch 2.1 only records Python stacks for export_stacks with the
+            # verbose experimental config; without it the .folded file is empty
+            prof = profile(activities=acts, with_stack=True,
+                           experimental_config=torch._C._profiler._ExperimentalConfig(verbose=True))
+            try:
+                with prof, record_function(f"tts:{label}"):
+                    yield
+            finally:
+                # a failed call still counts, or the session never completes
+                self._collect(prof)
+
+    def _collect(self, prof):
+        try:
+            tmp = os.path.join(PROFILE_DIR, f".stacks-{threading.get_ident()}.tmp")
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            prof.export_stacks(tmp, "self_cpu_time_total")
+            stacks = Counter()
+            with open(tmp, encoding="utf-8") as f:
+                for line in f:
+                    stack, _, n = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        stacks[stack] += int(n)
+            os.remove(tmp)
+            with self._lock:
+                self._stacks.update(stacks)
+                for e in prof.key_averages():
+                    op = self._ops[e.key]
+                    op[0] += e.count
+                    op[1] += e.self_cpu_time_total
+                    op[2] += e.cpu_time_total
+        except Exception as e:
+            self.last_error = f"collect failed: {e}"
+        finally:
+            # counted even when collecting failed, or the session never completes
+            with self._lock:
+                self.calls += 1
+                done = self.calls == self.armed
+            if done:
+                try:
+                    self._dump()
+                except OSError as e:
+                    self.last_error = f"dump failed: {e}"
+
+    def _dump(self):
+        stamp = _stamp()
+        folded = os.path.join(PROFILE_DIR, f"torch-{stamp}.folded")
+        table = os.path.join(PROFILE_DIR, f"torch-{stamp}.txt")
+        with self._lock:
+            _write_folded(folded, self._stacks)
+            rows = sorted(self._ops.items(), key=lambda kv: -kv[1][1])
+            calls = self.calls
+        with open(table, "w", encoding="utf-8") as f:
+            f.write(f"# {calls} tts call(s), CPU time in ms, sorted by self time\n")
+            f.write(f"{'operator':60} {'count':>8} {'self ms':>10} {'total ms':>10}\n")
+            for name, (count, self_us, total_us) in rows[:200]:
+                f.write(f"{name[:60]:60} {count:8d} {self_us / 1000:10.1f} {total_us / 1000:10.1f}\n")
+        self.last_files = {"folded": folded, "table": table}
+
+    def status(self) -> dict:
+        return {"remaining": self.remaining, "profiled_calls": self.calls, "last_files": self.last_files,
+                "last_error": self.last_error}
+
+sampler = SamplingProfiler()
+op_profiler = TorchOpProfiler()
+
+# ---- admin routes ----
+
+def require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(403, "Admin routes disabled: set ODIA_ADMIN_TOKEN")
+    if not hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(401, "Bad admin token")
+
+router = APIRouter(prefix="/admin/profile")
+
+@router.post("/sample")
+def start_sampling(seconds: float = 10.0, x_odia_admin_token: Optional[str] = Header(None)):
+    require_admin(x_odia_admin_token)
+    try:
+        sampler.start(min(seconds, 300.0))
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+    return sampler.status()
+
+@router.post("/sample/stop")
+def stop_sampling(x_odia_admin_token: Optional[str] = Header(None)):
+    require_admin(x_odia_admin_token)
+    sampler.stop()
+    return sampler.status()
+
+@router.post("/torch")
+def arm_torch(calls: int = 3, x_odia_admin_token: Optional[str] = Header(None)):
+    """Profile the next `calls` tts() calls; calls=0 disarms a pending session."""
+    require_admin(x_odia_admin_token)
+    if calls <= 0:
+        op_profiler.disarm()
+        return op_profiler.status()
+    try:
+        op_profiler.arm(max(1, min(calls, 50)))
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+    return op_profiler.status()
+
+@router.get("")
+def profile_status(x_odia_admin_token: Optional[str] = Header(None)):
+    require_admin(x_odia_admin_token)
+    return {"sample": sampler.status(), "torch": op_profiler.status()}
+
+@router.get("/files/{name}")
+def profile_file(name: str, x_odia_admin_token: Optional[str] = Header(None)):
+    require_admin(x_odia_admin_token)
+    path = os.path.join(PROFILE_DIR, os.path.basename(name))
+    if not os.path.exists(path):
+        raise HTTPException(404, "Profile not found")
+    return FileResponse(path, media_type="text/plain")
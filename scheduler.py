@@ -0,0 +1,187 @@
+import asyncio, math, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Admission control for the TTS model: a bounded wait queue in front of a
+# fixed pool of model workers, with per-agent concurrency caps, optional
+# client deadlines and cancellation of jobs whose client has gone away.
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"synthesis queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class DeadlineExceeded(Exception):
+    pass
+
+class ClientGone(Exception):
+    pass
+
+class SynthesisScheduler:
+    def __init__(self, workers: int = 1, max_queue: int = 16, per_agent: int = 2,
+                 poll_s: float = 0.25):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.per_agent = max(1, per_agent)
+        self.poll_s = poll_s
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts")
+        self._slots = asyncio.Semaphore(self.workers)
+        self._agent_slots: Dict[str, asyncio.Semaphore] = {}
+        self._avg_job_s = 3.0   # EWMA of model time, seeds Retry-After
+        self.waiting = 0
+        self.running = 0
+        self.stats = {"admitted": 0, "rejected": 0, "expired": 0,
+                      "cancelled": 0, "completed": 0, "failed": 0}
+
+    def retry_after(self) -> int:
+        backlog = self.waiting + self.running
+        return max(1, math.ceil(self._avg_job_s * backlog / self.workers))
+
+    def snapshot(self) -> dict:
+        return {"workers": self.workers, "max_queue": self.max_queue,
+                "per_agent": self.per_agent, "waiting": self.waiting,
+                "running": self.running, "avg_job_ms": int(self._avg_job_s * 1000),
+                **self.stats}
+
+    def _agent_slot(self, agent: str) -> asyncio.Semaphore:
+        # one semaphore per name, kept forever: callers pass a bounded name
+        # (the service's resolved voice), never raw client input
+        sem = self._agent_slots.get(agent)
+        if sem is None:
+            sem = self._agent_slots[agent] = asyncio.Semaphore(self.per_agent)
+        return sem
+
+    async def _check(self, deadline: Optional[float],
+                     is_disconnected: Optional[Callable[[], Awaitable[bool]]]):
+        if deadline is not None and time.monotonic() >= deadline:
+            self.stats["expired"] += 1
+            raise DeadlineExceeded("deadline passed while queued")
+        if is_disconnected is not None and await is_disconnected():
+            self.stats["cancelled"] += 1
+            raise ClientGone("client disconnected while queued")
+
+    async def _acquire(self, sem: asyncio.Semaphore, deadline, is_disconnected):
+        # One waiter per job keeps the semaphore's FIFO order; wake up every
+        # poll_s beside it so dead or expired jobs leave the queue early.
+        # The waiter is queued before anything is awaited, so slow checks
+        # can't let later jobs overtake this one.
+        waiter = asyncio.ensure_future(sem.acquire())
+        try:
+            while True:
+                timeout = self.poll_s
+                if deadline is not None:
+                    timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+                done, _ = await asyncio.wait({waiter}, timeout=timeout)
+                if done:
+                    return waiter.result()
+                await self._check(deadline, is_disconnected)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                sem.release()
+            else:
+                # a slot granted in the meantime is handed on by the semaphore
+                waiter.cancel()
+            raise
+
+    def _admit(self):
+        if self.waiting + 1 > self.max_queue:
+            self.stats["rejected"] += 1
+            raise QueueFull(self.retry_after())
+        self.waiting += 1
+        self.stats["admitted"] += 1
+
+    async def run(self, fn: Callable[[], object], agent: str = "lexi",
+                  deadline: Optional[float] = None,
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None):
+        """Queue fn() for a model worker; deadline is a time.monotonic() value."""
+        self._admit()
+        agent_sem = self._agent_slot(agent)
+        held = []
+        try:
+            await self._acquire(agent_sem, deadline, is_disconnected)
+            held.append(agent_sem)
+            await self._acquire(self._slots, deadline, is_disconnected)
+            held.append(self._slots)
+            # last look before the job reaches the model
+            await self._check(deadline, is_disconnected)
+        except BaseException:
+            self.waiting -= 1
+            for sem in held:
+                sem.release()
+            raise
+        self.waiting -= 1
+        return await self._start(fn, held)
+
+    async def run_all(self, fns: List[Callable[[], object]], agent: str = "lexi",
+                      deadline: Optional[float] = None,
+                      is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                      window: int = 0) -> list:
+        """Run the chunks of one request, at most `window` (default: every
+        worker) at a time; results come back in order.
+
+        The request is one queue entry and holds one per-agent slot however
+        many chunks it has; each chunk still queues for a worker in turn
+        with everyone else. The deadline applies until the first chunk
+        starts, since after that the request is being served."""
+        self._admit()
+        agent_sem = self._agent_slot(agent)
+        try:
+            await self._acquire(agent_sem, deadline, is_disconnected)
+        except BaseException:
+            self.waiting -= 1
+            raise
+        started = asyncio.Event()   # the first chunk reached a worker
+        results = [None] * len(fns)
+        todo = iter(range(len(fns)))
+
+        async def lane(first: bool):
+            if not first:
+                await started.wait()
+            for i in todo:
+                limit = None if started.is_set() else deadline
+                await self._acquire(self._slots, limit, is_disconnected)
+                try:
+                    await self._check(limit, is_disconnected)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                if not started.is_set():
+                    started.set()
+                    self.waiting -= 1
+                results[i] = await self._start(fns[i], [self._slots])
+
+        lanes = [asyncio.ensure_future(lane(n == 0))
+                 for n in range(max(1, min(window or self.workers, len(fns))))]
+        try:
+            await asyncio.gather(*lanes)
+            return results
+        except BaseException:
+            # one chunk failed: the rest are useless, pull them from the queue
+            for t in lanes:
+                t.cancel()
+            await asyncio.gather(*lanes, return_exceptions=True)
+            raise
+        finally:
+            if not started.is_set():
+                self.waiting -= 1
+            agent_sem.release()
+
+    async def _start(self, fn, held: list):
+        """Hand fn to a worker; the slots in held are released when it ends."""
+        self.running += 1
+        t0 = time.monotonic()
+
+        def finished(f):
+            # runs when the model call really ends, even if the caller was
+            # cancelled (barge-in, a failed sibling chunk): only then is the
+            # worker free again
+            self._avg_job_s = 0.8 * self._avg_job_s + 0.2 * (time.monotonic() - t0)
+            self.running -= 1
+            for sem in held:
+                sem.release()
+            failed = f.cancelled() or f.exception() is not None
+            self.stats["failed" if failed else "completed"] += 1
+
+        job = asyncio.get_running_loop().run_in_executor(self._pool, fn)
+        job.add_done_callback(finished)
+        return await asyncio.shield(job)
@@ -0,0 +1,4 @@
+import os, sys
+
+# the service modules live flat in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import os, threading
+
+from audio_cache import AudioCache, MemoryTier
+
+def test_memory_tier_evicts_least_recently_used():
+    mem = MemoryTier(max_bytes=10)
+    mem.put("a", b"1234")
+    mem.put("b", b"1234")
+    mem.get("a")
+    mem.put("c", b"1234")
+    assert "a" in mem and "c" in mem and "b" not in mem
+    assert mem.bytes == 8
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    AudioCache(str(tmp_path)).put("k", b"wav")
+    cache = AudioCache(str(tmp_path))
+    assert cache.get("k") == b"wav" and cache.get("k") == b"wav"
+    assert cache.hits["disk"] == 1 and cache.hits["memory"] == 1
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache = AudioCache(str(tmp_path), mem_bytes=0)
+    errors, start = [], threading.Barrier(8)
+    payloads = [bytes([i]) * 200_000 for i in range(8)]
+
+    def writer(data):
+        start.wait()
+        try:
+            for _ in range(20):
+                cache.put("hot", data)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(p,)) for p in payloads]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert cache.get("hot") in payloads
+    assert os.listdir(tmp_path) == ["hot.wav"]
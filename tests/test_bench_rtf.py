@@ -0,0 +1,36 @@
+from bench_rtf import compare
+
+def report(*rows):
+    return {"results": [{"label": label, "aggregate": agg} for label, agg in rows]}
+
+def test_flags_rises_beyond_tolerance(capsys):
+    baseline = report(("vits-cpu-t4", {"rtf_total": 0.20, "ttfc_ms_p50": 100.0, "peak_rss_mb": 900.0}))
+    current = report(("vits-cpu-t4", {"rtf_total": 0.25, "ttfc_ms_p50": 105.0, "peak_rss_mb": 700.0}))
+    assert compare(current, baseline, 0.10) == [("vits-cpu-t4", "rtf_total", 0.20, 0.25)]
+    assert "REGRESSION" in capsys.readouterr().out
+
+def test_within_tolerance_or_faster_passes():
+    baseline = report(("xtts-int8-t8", {"rtf_total": 1.0, "rtf_p95": 1.2}))
+    current = report(("xtts-int8-t8", {"rtf_total": 1.09, "rtf_p95": 0.8}))
+    assert compare(current, baseline, 0.10) == []
+
+def test_missing_labels_and_metrics_are_skipped():
+    baseline = report(("vits-cpu-t4", {"rtf_total": 0.2, "peak_rss_mb": None, "peak_cuda_mb": None}))
+    baseline["results"].append({"label": "xtts-cuda", "error": ["CUDA not available"]})
+    current = report(("vits-cpu-t4", {"rtf_total": 0.2, "peak_rss_mb": 5000.0, "peak_cuda_mb": None}),
+                     ("xtts-cuda", {"rtf_total": 9.0}),       # baseline run failed
+                     ("vits-int8-t4", {"rtf_total": 9.0}))    # not in the baseline
+    current["results"].append({"label": "xtts-cpu-t4", "error": ["boom"]})
+    assert compare(current, baseline, 0.10) == []
+
+def test_config_without_output_is_recorded_as_error(tmp_path, monkeypatch):
+    import argparse, json, subprocess
+    import bench_rtf
+
+    monkeypatch.setattr(subprocess, "run", lambda *a, **kw: subprocess.CompletedProcess(a, 0, "", ""))
+    out = tmp_path / "results.json"
+    args = argparse.Namespace(engines="vits", modes="cpu", threads="2", metadata="m.csv", limit=1,
+                              vits_dir=".", speaker_wav=None, out=str(out), baseline=None, save_baseline=False)
+    bench_rtf.cmd_run(args)
+    (result,) = json.loads(out.read_text())["results"]
+    assert result["label"] == "vits-cpu-t2" and result["error"] == ["exit 0 with no result"]
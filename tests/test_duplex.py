@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import duplex
+from duplex import EnergyVAD, sentences
+
+SR = 16000
+
+def tone(seconds, amp):
+    t = np.arange(int(SR * seconds)) / SR
+    return (amp * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def events(vad, audio):
+    return [e for e, _ in vad.feed(audio) if e]
+
+def test_vad_detects_an_utterance():
+    vad = EnergyVAD(SR)
+    assert events(vad, np.zeros(SR // 2, np.float32)) == []
+    assert events(vad, tone(0.5, 0.3)) == ["start"]
+    assert vad.speaking
+    assert events(vad, np.zeros(SR, np.float32)) == ["end"]
+    assert not vad.speaking
+
+def test_vad_ignores_clicks_and_background_hum():
+    vad = EnergyVAD(SR)
+    assert events(vad, tone(0.06, 0.5)) == []          # shorter than min_speech_ms
+    assert events(vad, np.zeros(SR // 4, np.float32)) == []
+    assert events(vad, tone(1.0, 0.005)) == []         # under min_rms
+
+def test_vad_handles_frames_split_across_chunks():
+    vad = EnergyVAD(SR)
+    audio = np.concatenate([tone(0.5, 0.3), np.zeros(SR, np.float32)])
+    got = []
+    for i in range(0, len(audio), 333):                # not a multiple of the frame size
+        got += events(vad, audio[i:i + 333])
+    assert got == ["start", "end"]
+
+async def deltas(*parts):
+    for p in parts:
+        yield p
+
+def collect(agen):
+    async def run():
+        return [s async for s in agen]
+    return asyncio.run(run())
+
+def test_sentences_split_streamed_deltas():
+    out = collect(sentences(deltas("Hello th", "ere. How ", "you dey? Fine", " o")))
+    assert out == ["Hello there.", "How you dey?", "Fine o"]
+
+def test_sentences_cut_long_runs_without_punctuation():
+    out = collect(sentences(deltas("word " * 100), max_chars=200))
+    assert all(len(s) <= 200 for s in out[:-1])
+    assert " ".join(out).split() == ["word"] * 100
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(duplex, "STT_MODEL", "stub")
+    monkeypatch.setattr(duplex, "LLM_URL", "")
+    monkeypatch.setattr(duplex, "HISTORY_DB", str(tmp_path / "h.sqlite3"))
+
+    async def synthesize(text, agent, voice):
+        return np.zeros(160, np.float32), SR
+
+    app = FastAPI()
+    app.include_router(duplex.router(synthesize))
+    return TestClient(app)
+
+def test_bad_frames_get_an_error_not_a_closed_socket(client):
+    with client.websocket_connect("/ws/converse") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        for frame in ("{not json", "[1, 2]"):
+            ws.send_text(frame)
+            assert ws.receive_json()["type"] == "error"
+        ws.send_bytes(b"\x00\x01\x02")                 # odd PCM16 length
+        assert ws.receive_json()["type"] == "error"
+        ws.send_text('{"type": "text", "text": "hello"}')
+        assert ws.receive_json() == {"type": "transcript", "text": "hello"}
+
+def test_out_of_range_sample_rate_is_rejected(client):
+    for rate in (0, 20, 200000):
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f"/ws/converse?sample_rate={rate}") as ws:
+                ws.receive_json()
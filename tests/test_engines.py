@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("torch")   # engines -> cpu_infer
+
+from engines import Engine, EngineRegistry, UnknownVoice, EngineUnavailable, MissingReference
+
+class FakeEngine(Engine):
+    def __init__(self, name, version=None, fail=False):
+        super().__init__()
+        self.name, self.version, self.fail = name, version, fail
+
+    def load(self):
+        if self.fail:
+            raise RuntimeError("checkpoint missing")
+
+    def synthesize(self, text, ref, language):
+        return [0.0]
+
+def make_registry(tmp_path, vits_fails=False):
+    ref = tmp_path / "lexi_ref.wav"
+    ref.write_bytes(b"RIFF")
+    registry = EngineRegistry()
+    registry.add_engine(FakeEngine("xtts"))
+    registry.add_engine(FakeEngine("vits", version="abc123", fail=vits_fails))
+    registry.add_voice("lexi", "xtts", str(ref))
+    registry.add_voice("legal", "xtts", str(tmp_path / "legal_ref.wav"))
+    registry.add_voice("pidgin", "vits")
+    registry.load_all()
+    return registry
+
+def test_engine_must_implement_load_and_synthesize():
+    class Half(Engine):
+        def load(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Half()
+
+def test_agents_and_voices_route_to_engines(tmp_path):
+    registry = make_registry(tmp_path)
+    engine, ref, tag, bucket = registry.pick("lexi")
+    assert (engine.name, ref, tag, bucket) == ("xtts", str(tmp_path / "lexi_ref.wav"), ref, "lexi")
+    # unknown agent names share lexi's voice and cap bucket
+    assert registry.pick("made-up-agent")[3] == "lexi"
+    # the voice pack's cache tag carries the checkpoint version
+    engine, ref, tag, bucket = registry.pick("lexi", voice="pidgin")
+    assert (engine.name, ref, tag, bucket) == ("vits", None, "vits:pidgin@abc123", "pidgin")
+
+def test_caller_wav_goes_to_xtts(tmp_path):
+    wav = tmp_path / "mine.wav"
+    wav.write_bytes(b"RIFF")
+    engine, ref, tag, bucket = make_registry(tmp_path).pick("lexi", speaker_wav=str(wav))
+    assert (engine.name, ref, bucket) == ("xtts", str(wav), "custom")
+
+def test_routing_errors(tmp_path):
+    registry = make_registry(tmp_path)
+    with pytest.raises(UnknownVoice):
+        registry.pick("lexi", voice="klingon")
+    with pytest.raises(MissingReference):
+        registry.pick("legal")
+
+def test_engine_that_fails_to_load_is_dropped(tmp_path):
+    registry = make_registry(tmp_path, vits_fails=True)
+    assert set(registry.engines) == {"xtts"}
+    assert "pidgin" not in registry.describe()["voices"]
+    with pytest.raises(EngineUnavailable):
+        registry.pick("lexi", voice="pidgin")
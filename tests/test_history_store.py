@@ -0,0 +1,44 @@
+from history_store import HistoryStore
+
+def test_ring_keeps_newest_turns(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.sqlite3"), ring=3)
+    for i in range(5):
+        store.append("s", f"q{i}", f"a{i}")
+    assert [t["user"] for t in store.turns("s")] == ["q2", "q3", "q4"]
+    assert store.count() == 5
+
+def test_sessions_survive_restart_and_eviction(tmp_path):
+    db = str(tmp_path / "h.sqlite3")
+    store = HistoryStore(db, max_sessions=1)
+    store.append("a", "hi", "hello")
+    store.append("b", "yo", "hey")   # evicts "a" from memory
+    assert [t["reply"] for t in store.turns("a")] == ["hello"]
+    assert [t["reply"] for t in HistoryStore(db).turns("b")] == ["hey"]
+
+def test_two_processes_see_each_others_turns(tmp_path):
+    db = str(tmp_path / "h.sqlite3")
+    shim, duplex = HistoryStore(db), HistoryStore(db)
+    shim.append("s", "typed", "reply 1")
+    assert [t["user"] for t in duplex.turns("s")] == ["typed"]   # ring now cached
+    shim.append("s", "typed again", "reply 2")
+    duplex.append("s", "spoken", "reply 3")
+    assert [t["user"] for t in duplex.turns("s")] == ["typed", "typed again", "spoken"]
+    assert [t["user"] for t in shim.turns("s")] == ["typed", "typed again", "spoken"]
+
+def test_build_messages_trims_to_budget(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.sqlite3"))
+    for i in range(10):
+        store.append("s", "x" * 200, f"a{i}")
+    msgs = store.build_messages("s", "now", token_budget=200)
+    assert msgs[-1] == {"role": "user", "content": "now"}
+    assert msgs[-2] == {"role": "assistant", "content": "a9"}
+    assert len(msgs) < 21
+
+def test_failed_append_leaves_store_usable(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.sqlite3"))
+    try:
+        store.append("s", None, "reply")   # user is NOT NULL
+    except Exception:
+        pass
+    store.append("s", "hi", "hello")
+    assert [t["user"] for t in store.turns("s")] == ["hi"]
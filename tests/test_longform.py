@@ -0,0 +1,25 @@
+import numpy as np
+
+from longform import split_text, stitch
+
+def test_chunks_respect_limit_and_keep_text():
+    text = " ".join(f"Sentence number {i} is here, with a clause; and more words." for i in range(20))
+    chunks = split_text(text, 120)
+    assert all(len(c) <= 120 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_prefers_sentence_boundaries():
+    assert split_text("First one. Second one. Third one.", 22) == ["First one. Second one.", "Third one."]
+
+def test_overlong_token_is_hard_split():
+    url = "https://example.com/" + "a" * 280
+    chunks = split_text(f"Open {url} now.", 220)
+    assert all(len(c) <= 220 for c in chunks)
+    assert "".join(c.replace(" ", "") for c in chunks) == f"Open{url}now."
+
+def test_stitch_crossfades_and_matches_loudness():
+    sr = 1000
+    loud, quiet = np.full(500, 0.5, np.float32), np.full(500, 0.2, np.float32)
+    out = stitch([loud, quiet, loud], sr, crossfade_ms=40)
+    assert len(out) == 1500 - 2 * 40
+    assert np.allclose(out, 0.5, atol=1e-5)
@@ -0,0 +1,51 @@
+import os, time
+
+import pytest
+
+pytest.importorskip("torch")   # engines -> cpu_infer
+
+from engines import Engine, EngineRegistry
+from model_manager import ModelManager
+
+class FakeEngine(Engine):
+    name = "vits"
+
+    def __init__(self, checkpoint, version="v0"):
+        super().__init__()
+        self.checkpoint, self.config, self.version = checkpoint, None, version
+
+    def load(self):
+        pass
+
+    def synthesize(self, text, ref, language):
+        return [0.0]
+
+def wait_idle(manager):
+    for _ in range(200):
+        if not manager.loading:
+            return
+        time.sleep(0.01)
+
+def test_failed_checkpoint_is_not_reloaded_until_it_changes(tmp_path):
+    ckpt = tmp_path / "best_model.pth"
+    ckpt.write_bytes(b"broken")
+    registry = EngineRegistry()
+    registry.add_engine(FakeEngine(str(ckpt)))
+    attempts = []
+
+    def factory(config, checkpoint):
+        attempts.append(checkpoint)
+        raise RuntimeError("bad checkpoint")
+
+    manager = ModelManager(registry, "vits", factory, watch=str(ckpt))
+    for _ in range(8):
+        manager.poll()
+        wait_idle(manager)
+    assert len(attempts) == 1 and manager.last_error
+
+    ckpt.write_bytes(b"retrained")
+    os.utime(ckpt, ns=(time.time_ns(), time.time_ns() + 10**9))
+    for _ in range(3):
+        manager.poll()
+        wait_idle(manager)
+    assert len(attempts) == 2
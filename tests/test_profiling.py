@@ -0,0 +1,63 @@
+import pytest
+from fastapi import HTTPException
+
+import profiling
+
+class BrokenProf:
+    def export_stacks(self, path, metric):
+        raise OSError("disk full")
+
+class FakeEvent:
+    key, count, self_cpu_time_total, cpu_time_total = "aten::mm", 2, 1500.0, 2000.0
+
+class FakeProf:
+    def export_stacks(self, path, metric):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("engines.py:tts;aten::mm 7\n")
+
+    def key_averages(self):
+        return [FakeEvent()]
+
+@pytest.fixture
+def op_profiler(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return profiling.TorchOpProfiler()
+
+def test_session_completes_and_dumps(op_profiler, tmp_path):
+    op_profiler.arm(2)
+    for _ in range(2):
+        assert op_profiler._take()
+        op_profiler._collect(FakeProf())
+    assert not op_profiler._take()
+    folded = op_profiler.last_files["folded"]
+    assert open(folded, encoding="utf-8").read() == "engines.py:tts;aten::mm 14\n"
+    op_profiler.arm(1)   # a finished session can be re-armed
+
+def test_failed_collect_still_counts(op_profiler):
+    op_profiler.arm(1)
+    op_profiler._take()
+    op_profiler._collect(BrokenProf())
+    assert op_profiler.calls == 1 and "disk full" in op_profiler.last_error
+    op_profiler.arm(1)
+
+def test_disarm_releases_a_stuck_session(op_profiler):
+    op_profiler.arm(3)
+    op_profiler._take()
+    op_profiler._collect(FakeProf())
+    with pytest.raises(RuntimeError):
+        op_profiler.arm(1)
+    op_profiler.disarm()
+    assert op_profiler.remaining == 0
+    op_profiler.arm(1)
+
+def test_admin_token(monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "s3cret")
+    profiling.require_admin("s3cret")
+    for bad in ("nope", None):
+        with pytest.raises(HTTPException) as e:
+            profiling.require_admin(bad)
+        assert e.value.status_code == 401
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "")
+    with pytest.raises(HTTPException) as e:
+        profiling.require_admin("s3cret")
+    assert e.value.status_code == 403
@@ -0,0 +1,136 @@
+import asyncio, random, threading, time
+
+import pytest
+
+from scheduler import SynthesisScheduler, QueueFull, DeadlineExceeded
+
+def test_jobs_run_in_submission_order():
+    async def main():
+        sched = SynthesisScheduler(workers=1, max_queue=32, per_agent=32, poll_s=0.02)
+        order = []
+
+        async def connected():
+            # like request.is_disconnected(): takes a while and varies
+            await asyncio.sleep(random.random() * 0.01)
+            return False
+
+        def job(i):
+            time.sleep(0.015)
+            order.append(i)
+
+        tasks = []
+        for i in range(12):
+            tasks.append(asyncio.ensure_future(sched.run(lambda i=i: job(i), is_disconnected=connected)))
+            await asyncio.sleep(0.003)
+        await asyncio.gather(*tasks)
+        return order
+
+    random.seed(1)
+    assert asyncio.run(main()) == list(range(12))
+
+def test_full_queue_is_rejected():
+    async def main():
+        sched = SynthesisScheduler(workers=1, max_queue=1, per_agent=4)
+        gate = threading.Event()
+        first = asyncio.ensure_future(sched.run(gate.wait))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(sched.run(lambda: None))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull):
+            await sched.run(lambda: None)
+        gate.set()
+        await asyncio.gather(first, second)
+        return sched.snapshot()
+
+    snap = asyncio.run(main())
+    assert snap["rejected"] == 1 and snap["completed"] == 2
+
+def test_deadline_drops_queued_job():
+    async def main():
+        sched = SynthesisScheduler(workers=1, max_queue=4, per_agent=4, poll_s=0.01)
+        gate = threading.Event()
+        busy = asyncio.ensure_future(sched.run(gate.wait))
+        await asyncio.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            await sched.run(lambda: None, deadline=time.monotonic() + 0.05)
+        gate.set()
+        await busy
+        return sched.snapshot()
+
+    snap = asyncio.run(main())
+    assert snap["expired"] == 1 and snap["waiting"] == 0
+
+def test_cancelled_job_holds_its_worker_until_it_finishes():
+    async def main():
+        sched = SynthesisScheduler(workers=1, max_queue=4, per_agent=4)
+        gate = threading.Event()
+        task = asyncio.ensure_future(sched.run(gate.wait))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        still_busy = (sched.running, sched._slots.locked())
+        gate.set()
+        await sched.run(lambda: None)   # gets the slot once the model call ends
+        return still_busy, sched.snapshot()
+
+    still_busy, snap = asyncio.run(main())
+    assert still_busy == (1, True)
+    assert snap["running"] == 0 and snap["waiting"] == 0
+
+def test_run_all_failure_releases_every_slot():
+    async def main():
+        sched = SynthesisScheduler(workers=2, max_queue=8, per_agent=8, poll_s=0.01)
+
+        def boom():
+            raise ValueError("bad chunk")
+
+        with pytest.raises(ValueError):
+            await sched.run_all([boom] + [lambda: time.sleep(0.02)] * 5)
+        await asyncio.sleep(0.1)
+        return sched.snapshot()
+
+    snap = asyncio.run(main())
+    assert snap["waiting"] == 0 and snap["running"] == 0
+
+def test_long_request_is_one_admission_and_bounded_window():
+    async def main():
+        sched = SynthesisScheduler(workers=4, max_queue=2, per_agent=1, poll_s=0.01)
+        lock, live, peak = threading.Lock(), [0], [0]
+
+        def chunk(i):
+            with lock:
+                live[0] += 1
+                peak[0] = max(peak[0], live[0])
+            time.sleep(0.01)
+            with lock:
+                live[0] -= 1
+            return i
+
+        # 32 chunks through a 2-entry queue, 3 at a time despite per_agent=1
+        out = await sched.run_all([lambda i=i: chunk(i) for i in range(32)], window=3)
+        return out, peak[0], sched.snapshot()
+
+    out, peak, snap = asyncio.run(main())
+    assert out == list(range(32))
+    assert peak == 3
+    assert snap["admitted"] == 1 and snap["completed"] == 32
+    assert snap["waiting"] == 0 and snap["running"] == 0
+
+def test_short_request_is_not_starved_by_a_long_one():
+    async def main():
+        sched = SynthesisScheduler(workers=1, max_queue=4, per_agent=4, poll_s=0.01)
+        order = []
+
+        def job(name):
+            time.sleep(0.005)
+            order.append(name)
+
+        long = asyncio.ensure_future(sched.run_all([lambda i=i: job(f"L{i}") for i in range(6)]))
+        await asyncio.sleep(0.012)
+        await sched.run(lambda: job("S"))
+        await long
+        return order
+
+    order = asyncio.run(main())
+    assert order.index("S") < order.index("L5")
@@ -0,0 +1,62 @@
+import asyncio, json, time
+
+import pytest
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import tracing
+
+@pytest.fixture(autouse=True)
+def trace_dir(tmp_path, monkeypatch):
+    # every test exports into its own directory, never the repo
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracing, "_exporters", {})
+    return tmp_path
+
+def make_app():
+    app = FastAPI()
+    tracing.install(app, "test")
+    seen = {}
+
+    @app.get("/work")
+    async def work():
+        with tracing.span("step"):
+            pass
+        return {"trace": tracing.current().trace_id}
+
+    @app.get("/poll")
+    async def poll(request: Request):
+        seen["disconnected"] = await request.is_disconnected()
+        return {}
+
+    return app, seen
+
+def test_headers_and_export(trace_dir):
+    app, _ = make_app()
+    r = TestClient(app).get("/work", headers={tracing.TRACE_HEADER: "abc123"})
+    assert r.json() == {"trace": "abc123"}
+    assert r.headers[tracing.TRACE_HEADER] == "abc123"
+    assert "step;dur=" in r.headers["server-timing"]
+    out = trace_dir / "traces.test.jsonl"
+    for _ in range(50):   # written by the listener thread
+        if out.exists() and out.read_text():
+            break
+        time.sleep(0.02)
+    rec = json.loads(out.read_text().splitlines()[-1])
+    assert rec["trace_id"] == "abc123" and rec["status"] == 200 and rec["spans"][0]["name"] == "step"
+
+def test_disconnect_reaches_the_endpoint():
+    app, seen = make_app()
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/poll", "raw_path": b"/poll", "query_string": b"",
+             "root_path": "", "headers": [], "client": ("test", 1), "server": ("test", 80)}
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    asyncio.run(app(scope, receive, send))
+    assert seen["disconnected"] is True
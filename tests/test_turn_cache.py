@@ -0,0 +1,58 @@
+import turn_cache
+from turn_cache import TurnCache, normalize
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_normalize_folds_case_punctuation_and_spacing():
+    assert normalize(" How much  is it ?? ") == normalize("how much is it") == "how much is it"
+    assert TurnCache.key("lexi", "Hi!") != TurnCache.key("legal", "Hi!")
+
+def test_hit_and_miss():
+    cache = TurnCache()
+    assert cache.get("lexi", "How much is it?") is None
+    cache.put("lexi", "How much is it?", "Na 5k.", "/audio/a")
+    assert cache.get("lexi", "how much is it") == ("Na 5k.", "/audio/a")
+    assert cache.get("legal", "how much is it") is None
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(turn_cache.time, "monotonic", clock)
+    cache = TurnCache(ttl_s=60)
+    cache.put("lexi", "hi", "hello", "/audio/a")
+    clock.now += 59
+    assert cache.get("lexi", "hi") is not None
+    clock.now += 2
+    assert cache.get("lexi", "hi") is None
+    assert cache.stats["expired"] == 1 and cache.snapshot()["entries"] == 0
+
+def test_least_recently_used_is_evicted():
+    cache = TurnCache(max_entries=2)
+    cache.put("lexi", "a", "A", "/audio/a")
+    cache.put("lexi", "b", "B", "/audio/b")
+    cache.get("lexi", "a")
+    cache.put("lexi", "c", "C", "/audio/c")
+    assert cache.get("lexi", "b") is None
+    assert cache.get("lexi", "a") and cache.get("lexi", "c")
+    assert cache.stats["evicted"] == 1
+
+def test_zero_ttl_disables_and_empty_audio_is_not_cached():
+    off = TurnCache(ttl_s=0)
+    off.put("lexi", "hi", "hello", "/audio/a")
+    assert off.get("lexi", "hi") is None and off.snapshot()["entries"] == 0
+    on = TurnCache()
+    on.put("lexi", "hi", "hello", "")
+    assert on.snapshot()["entries"] == 0
+
+def test_hit_rate():
+    cache = TurnCache()
+    assert cache.snapshot()["hit_rate"] == 0.0
+    cache.put("lexi", "hi", "hello", "/audio/a")
+    for text in ("hi", "hi", "hi", "bye"):
+        cache.get("lexi", text)
+    snap = cache.snapshot()
+    assert (snap["hits"], snap["misses"], snap["hit_rate"]) == (3, 1, 0.75)
@@ -0,0 +1,194 @@
+import os, sys, glob, json, time, uuid, queue, atexit, logging, threading, argparse, contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional
+
+# Lightweight request tracing shared by the chat shim and the TTS service.
+# The shim mints a trace id and forwards it in X-ODIA-Trace-Id; each
+# service records span timings for its stages, answers with a
+# Server-Timing header and appends one JSON line per request to its own
+# file next to ODIA_TRACE_FILE (traces.tts.jsonl, traces.chat_shim.jsonl:
+# one writer per file, so rotation works on Windows too). Lines are written
+# by a background thread and files rotate at ODIA_TRACE_MAX_MB.
+# `python tracing.py` joins the files and summarizes the slowest traces.
+
+TRACE_HEADER = "X-ODIA-Trace-Id"
+TRACE_FILE = os.getenv("ODIA_TRACE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl"))
+TRACE_EXPORT = os.getenv("ODIA_TRACE", "1") == "1"
+TRACE_MAX_MB = float(os.getenv("ODIA_TRACE_MAX_MB", "50"))
+TRACE_BACKUPS = int(os.getenv("ODIA_TRACE_BACKUPS", "3"))          # <file>.1 .. .N
+# still get trace headers, but aren't written to the file
+TRACE_SKIP = tuple(p for p in os.getenv("ODIA_TRACE_SKIP", "/health,/audio/").split(",") if p.strip())
+
+_current: contextvars.ContextVar = contextvars.ContextVar("odia_trace", default=None)
+_exporters: Dict[str, logging.Logger] = {}
+_exporters_lock = threading.Lock()
+
+def trace_file(service: str) -> str:
+    root, ext = os.path.splitext(TRACE_FILE)
+    return f"{root}.{service}{ext}"
+
+def _export_log(service: str) -> logging.Logger:
+    # the request only enqueues the line; a listener thread does the file I/O
+    with _exporters_lock:
+        log = _exporters.get(service)
+        if log is None:
+            handler = RotatingFileHandler(trace_file(service), maxBytes=int(TRACE_MAX_MB * 2**20),
+                                          backupCount=TRACE_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            records: queue.Queue = queue.Queue()
+            listener = QueueListener(records, handler)
+            listener.start()
+            atexit.register(listener.stop)
+            log = _exporters[service] = logging.getLogger(f"odia-trace.{service}")
+            log.propagate = False
+            log.setLevel(logging.INFO)
+            log.addHandler(QueueHandler(records))
+        return log
+
+class Trace:
+    def __init__(self, service: str, trace_id: Optional[str] = None):
+        self.service = service
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.ts = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()   # spans also come from model worker threads
+
+    def add(self, name: str, start: float, end: float, **attrs):
+        """Record a span from two time.perf_counter() readings."""
+        with self._lock:
+            self.spans.append({"name": name, "start_ms": round((start - self.t0) * 1000, 2),
+                               "dur_ms": round((end - start) * 1000, 2), **attrs})
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), **attrs)
+
+    def server_timing(self) -> str:
+        # parallel chunks produce several spans per name; report the sum
+        totals = defaultdict(float)
+        with self._lock:
+            for s in self.spans:
+                totals[s["name"]] += s["dur_ms"]
+        total = (time.perf_counter() - self.t0) * 1000
+        parts = [f"{name};dur={dur:.1f}" for name, dur in totals.items()]
+        return ", ".join(parts + [f"total;dur={total:.1f}"])
+
+    def export(self, path: str, status: int):
+        if not TRACE_EXPORT or path.startswith(TRACE_SKIP):
+            return
+        with self._lock:
+            record = {"trace_id": self.trace_id, "service": self.service, "path": path,
+                      "status": status, "ts": self.ts,
+                      "total_ms": round((time.perf_counter() - self.t0) * 1000, 2),
+                      "spans": list(self.spans)}
+        _export_log(self.service).info(json.dumps(record))
+
+def current() -> Trace:
+    """The request's trace; a detached, never-exported one outside a request."""
+    trace = _current.get()
+    return trace if trace is not None else Trace("detached")
+
+def span(name: str, **attrs):
+    return current().span(name, **attrs)
+
+class TraceMiddleware:
+    """Pure ASGI middleware: unlike @app.middleware("http") it passes the
+    client's receive channel through untouched, so request.is_disconnected()
+    still sees an http.disconnect and the scheduler can drop the job."""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace_id = dict(scope["headers"]).get(TRACE_HEADER.lower().encode(), b"").decode("latin-1")
+        trace = Trace(self.service, trace_id or None)
+        status = 500
+
+        async def send_traced(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (TRACE_HEADER.encode(), trace.trace_id.encode()),
+                    (b"server-timing", trace.server_timing().encode())]
+            await send(message)
+
+        token = _current.set(trace)
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            _current.reset(token)
+            trace.export(scope["path"], status)
+
+def install(app, service: str):
+    """Trace every request of a FastAPI app."""
+    app.add_middleware(TraceMiddleware, service=service)
+
+# ---- CLI ----
+
+def default_files() -> List[str]:
+    """Every service's trace file next to TRACE_FILE, rotated ones included."""
+    root, ext = os.path.splitext(TRACE_FILE)
+    return sorted(glob.glob(f"{glob.escape(root)}.*{ext}") + glob.glob(f"{glob.escape(root)}.*{ext}.*"))
+
+def _load(paths: List[str]):
+    traces = defaultdict(list)
+    for p in paths:
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rec = json.loads(line)
+                    traces[rec["trace_id"]].append(rec)
+    return traces
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+def summarize(paths: List[str], top: int = 10, path_filter: Optional[str] = None, out=sys.stdout):
+    traces = _load(paths)
+    rows, per_stage = [], defaultdict(list)
+    for trace_id, recs in traces.items():
+        if path_filter and not any(path_filter in r["path"] for r in recs):
+            continue
+        stages = defaultdict(float)
+        for r in recs:
+            for s in r["spans"]:
+                stages[f'{r["service"]}.{s["name"]}'] += s["dur_ms"]
+        for name, dur in stages.items():
+            per_stage[name].append(dur)
+        # the outermost hop (the shim, when present) spans the whole turn
+        root = max(recs, key=lambda r: r["total_ms"])
+        rows.append((root["total_ms"], trace_id, root, stages))
+    rows.sort(key=lambda r: r[0], reverse=True)
+
+    print(f"{len(rows)} traces in {', '.join(paths)}", file=out)
+    print(f"\n{'stage':32} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}", file=out)
+    for name, vals in sorted(per_stage.items()):
+        print(f"{name:32} {len(vals):6d} {_pct(vals, .5):9.1f} {_pct(vals, .95):9.1f} {max(vals):9.1f}", file=out)
+    print(f"\nslowest {min(top, len(rows))}:", file=out)
+    for total, trace_id, root, stages in rows[:top]:
+        breakdown = "  ".join(f"{n}={d:.0f}" for n, d in sorted(stages.items(), key=lambda kv: -kv[1]))
+        print(f"{total:9.1f} ms  {trace_id}  {root['service']} {root['path']} [{root['status']}]  {breakdown}", file=out)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Summarize ODIA request traces")
+    ap.add_argument("files", nargs="*", help="default: every service's file next to ODIA_TRACE_FILE")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--path", help="only traces touching this endpoint, e.g. /chat/lexi")
+    a = ap.parse_args()
+    files = a.files or default_files()
+    if not files:
+        sys.exit(f"no trace files next to {TRACE_FILE}")
+    summarize(files, a.top, a.path)
@@ -0,0 +1,61 @@
+import re, time, threading
+from collections import OrderedDict
+from typing import Optional
+
+# Full-turn cache for the chat shim: agent + normalized user text ->
+# (reply text, audio_url). Entries expire after ttl_s and the least
+# recently used are evicted past max_entries.
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACE = re.compile(r"\s+")
+
+def normalize(text: str) -> str:
+    # "How much is it?" / "how much is it" / " How much  is it ?? " share an entry
+    return _SPACE.sub(" ", _PUNCT.sub(" ", text.lower())).strip()
+
+class TurnCache:
+    def __init__(self, ttl_s: float = 3600, max_entries: int = 512):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()   # key -> (expires, reply, audio_url)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    @staticmethod
+    def key(agent: str, text: str) -> str:
+        return f"{agent}|{normalize(text)}"
+
+    def get(self, agent: str, text: str) -> Optional[tuple]:
+        """(reply_text, audio_url) or None."""
+        if self.ttl_s <= 0:
+            return None
+        k = self.key(agent, text)
+        with self._lock:
+            item = self._items.get(k)
+            if item is not None and item[0] < time.monotonic():
+                del self._items[k]
+                self.stats["expired"] += 1
+                item = None
+            if item is None:
+                self.stats["misses"] += 1
+                return None
+            self._items.move_to_end(k)
+            self.stats["hits"] += 1
+            return item[1], item[2]
+
+    def put(self, agent: str, text: str, reply: str, audio_url: str):
+        if self.ttl_s <= 0 or not audio_url:
+            return
+        k = self.key(agent, text)
+        with self._lock:
+            self._items[k] = (time.monotonic() + self.ttl_s, reply, audio_url)
+            self._items.move_to_end(k)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {"entries": len(self._items), "max_entries": self.max_entries, "ttl_s": self.ttl_s,
+                    **self.stats, "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0}